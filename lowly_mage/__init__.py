@@ -0,0 +1,17 @@
+import os
+
+'''Struggle of a Lowly Mage. The battle rules are in logic.py and don't need pygame, so they (and the
+solver, the simulator, snapshots and the battle server built on them) can be imported on their own
+without starting pygame or opening a window. The game is put together in game.py out of rendering.py,
+assets.py, audio.py and the rest, and only starts pygame once a game is actually made:
+
+    python -m lowly_mage          (play)
+    python -X importtime -c "import lowly_mage.logic"   (what importing the rules costs)
+
+The images, sounds, battle_data.json and solver.bin live next to this package, in the folder above it,
+and are always found there whatever folder the game is started from.'''
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def data_path(name):
+    return os.path.join(ROOT, name)
@@ -0,0 +1,4 @@
+from .game import main
+
+# python -m lowly_mage
+main()
@@ -0,0 +1,94 @@
+'''Animations that play out over several frames instead of freezing the game with pygame.time.delay().
+The game loop calls Timeline.update() with the milliseconds since the last frame, so input keeps being
+handled and frames keep being drawn while something is animating. A Tween moves a value from start to
+end with an easing curve, a SpriteSwap shows a different sprite for a while and then puts the old one
+back, and either can be chained with then() or call a function when it finishes.'''
+
+def linear(t):
+    return t
+
+def ease_in(t):
+    return t * t
+
+def ease_out(t):
+    return 1 - (1 - t) * (1 - t)
+
+def ease_in_out(t):
+    return 2 * t * t if t < 0.5 else 1 - 2 * (1 - t) * (1 - t)
+
+class Tween:
+    def __init__(self, duration, start=0.0, end=1.0, on_update=None, easing=linear, on_complete=None):
+        self.duration = duration  # Milliseconds
+        self.start = start
+        self.end = end
+        self.on_update = on_update  # Called with the eased value every frame
+        self.easing = easing
+        self.on_complete = on_complete
+        self.elapsed = 0
+        self.next = None
+
+    # Plays another animation once this one finishes, and returns it so chains can keep going
+    def then(self, animation):
+        self.next = animation
+        return animation
+
+    def begin(self):
+        pass
+
+    def finish(self):
+        pass
+
+    # Moves the animation forward, returns True once it has finished
+    def advance(self, dt):
+        self.elapsed += dt
+        t = min(1.0, self.elapsed / self.duration) if self.duration > 0 else 1.0
+        if self.on_update:
+            self.on_update(self.start + (self.end - self.start) * self.easing(t))
+        return t >= 1.0
+
+class SpriteSwap(Tween):
+    def __init__(self, poses, key, sprite, duration, on_complete=None):
+        Tween.__init__(self, duration, on_complete=on_complete)
+        self.poses = poses  # Dictionary the renderer reads the sprite to draw from
+        self.key = key
+        self.sprite = sprite
+        self.previous = None
+
+    def begin(self):
+        self.previous = self.poses.get(self.key)
+        self.poses[self.key] = self.sprite
+
+    def finish(self):
+        self.poses[self.key] = self.previous
+
+class Timeline:
+    def __init__(self):
+        self.playing = []
+        self.started = []  # Animations that haven't had begin() called yet
+
+    def play(self, animation):
+        self.started.append(animation)
+        return animation
+
+    def busy(self):
+        return bool(self.playing or self.started)
+
+    def update(self, dt):
+        for animation in self.started:
+            animation.begin()
+            self.playing.append(animation)
+        self.started = []
+
+        still_playing = []
+        for animation in self.playing:
+            if not animation.advance(dt):
+                still_playing.append(animation)
+                continue
+            animation.finish()
+            if animation.on_complete:
+                animation.on_complete()
+            if animation.next:
+                animation.next.begin()
+                still_playing.append(animation.next)
+        # Completion callbacks may have started new animations, those join on the next update
+        self.playing = still_playing
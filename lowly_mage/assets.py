@@ -0,0 +1,161 @@
+import json
+import os
+import threading
+import time
+import pygame
+from . import data_path
+from .audio import init_mixer
+
+'''Every image and sound the game uses, and when it gets loaded. The 'title' group is loaded before the
+first frame, the 'battle' group is loaded on a background thread while the title music plays, and
+anything without a group is only loaded the first time it is asked for. Whatever hasn't finished loading
+by the time the game needs it is loaded right then instead. Music isn't decoded at all, it is streamed
+from its file by audio.py, so loading a music entry just hands back the file name.
+
+Sprites that have been packed into the atlas (see atlas.py) aren't loaded one by one: the atlas is
+decoded once with the battle group and each sprite is a subsurface of it.'''
+
+# name: (file, 'image', 'sound' or 'music', size to scale images to, group)
+MANIFEST = {
+    'gametitle': ('gametitle.png', 'image', None, 'title'),
+    'title': ('title.mp3', 'music', None, 'title'),
+    'selectionsound': ('selectionsound.wav', 'sound', None, 'title'),
+
+    'atlas': ('atlas.png', 'image', None, 'battle'),
+    'arena': ('arena.png', 'image', None, 'battle'),
+    'trees': ('trees.png', 'image', None, 'battle'),
+    'bushes': ('bushes.png', 'image', None, 'battle'),
+    'wizardstationary': ('wizardstationary.png', 'image', None, 'battle'),
+    'wizardattack': ('wizardattack.png', 'image', None, 'battle'),
+    'wizardfireball': ('wizardfireball.png', 'image', None, 'battle'),
+    'staffwhack': ('staffwhack.png', 'image', (32, 32), 'battle'),
+    'healthpotion': ('healthpotion.png', 'image', (32, 32), 'battle'),
+    'manapotion': ('manapotion.png', 'image', (32, 32), 'battle'),
+    'goblin': ('goblin.png', 'image', None, 'battle'),
+    'goblinattack': ('goblinattack.png', 'image', None, 'battle'),
+    'knight': ('knight.png', 'image', None, 'battle'),
+    'knightattack': ('knightattack.png', 'image', None, 'battle'),
+    'golem': ('golem.png', 'image', None, 'battle'),
+    'golemattack': ('golemattack.png', 'image', None, 'battle'),
+    'dragon': ('dragon.png', 'image', None, 'battle'),
+    'dragonattack': ('dragonattack.png', 'image', None, 'battle'),
+    'fire': ('fire.png', 'image', None, 'battle'),
+    'lightning': ('lightning.png', 'image', None, 'battle'),
+    'poison': ('poison.png', 'image', None, 'battle'),
+    'light': ('light.png', 'image', None, 'battle'),
+    'battle': ('battle.mp3', 'music', None, 'battle'),
+    'blaster': ('blaster.mp3', 'sound', None, 'battle'),
+
+    'pressbutton': ('pressbutton.wav', 'sound', None, None),
+    'buttonhovering': ('buttonhovering.png', 'image', None, None),
+    'bargainbutton': ('bargainbutton.png', 'image', None, None),
+    'quitbutton': ('quitbutton.png', 'image', None, None),
+    'wizardattacktwitch': ('wizardattacktwitch.png', 'image', None, None),
+    'wizardstationarylow': ('wizardstationarylow.png', 'image', None, None),
+    'wizardstationarylower': ('wizardstationarylower.png', 'image', None, None),
+    'poisonresistancepotion': ('poisonresistancepotion.png', 'image', (32, 32), None),
+    'rng': ('rng.png', 'image', None, None)
+}
+
+ATLAS_INDEX = data_path('atlas.json')
+
+# Reads where each sprite is in the atlas, or returns None if the atlas hasn't been built
+def load_atlas_index(path=ATLAS_INDEX):
+    if not os.path.exists(path):
+        return None
+    with open(path) as index_file:
+        index = json.load(index_file)
+    return {name: pygame.Rect(rect) for name, rect in index['regions'].items()}
+
+# Load assets
+def load_image(name, scale=None):
+    try:
+        img = pygame.image.load(name)
+        if scale:
+            img = pygame.transform.scale(img, scale)
+        return img
+    except:
+        print("Failed to load image:",name)
+        return pygame.Surface((50, 50))  # Return blank surface if image fails to load
+
+# Load sounds, the mixer has to be running to decode them
+def load_sound(name):
+    init_mixer()
+    try:
+        return pygame.mixer.Sound(name)
+    except:
+        print("Failed to load sound:",name)
+        return None
+
+class AssetLoader:
+    def __init__(self, manifest=MANIFEST, atlas_index=ATLAS_INDEX):
+        self.manifest = manifest
+        self.atlas = load_atlas_index(atlas_index)  # Sprite name: where it is in the atlas
+        self.loaded = {}  # Decoded assets, images still in the file's pixel format
+        self.ready = {}  # Assets handed out to the game, images converted to the display's format
+        self.load_times = {}  # Milliseconds each asset took to load
+        self.loaded_by = {}  # Whether each asset was loaded 'upfront', in the 'background' or 'on demand'
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def load(self, name, how='upfront'):
+        with self.lock:
+            if name in self.loaded:
+                return
+            file, kind, scale, group = self.manifest[name]
+            start = time.perf_counter()
+            if kind == 'image':
+                self.loaded[name] = load_image(data_path(file), scale)
+            elif kind == 'sound':
+                self.loaded[name] = load_sound(data_path(file))
+            else:
+                self.loaded[name] = data_path(file)
+            self.load_times[name] = (time.perf_counter() - start) * 1000
+            self.loaded_by[name] = how
+
+    # Everything in a group that has to be loaded from its own file
+    def names(self, group):
+        names = [name for name, entry in self.manifest.items() if entry[3] == group]
+        if self.atlas:
+            return [name for name in names if name not in self.atlas]
+        return [name for name in names if name != 'atlas']
+
+    def load_group(self, group):
+        for name in self.names(group):
+            self.load(name)
+
+    # Starts loading a group on a background thread and returns straight away
+    def load_in_background(self, group):
+        def work():
+            for name in self.names(group):
+                self.load(name, 'background')
+        self.thread = threading.Thread(target=work, name='asset-loader', daemon=True)
+        self.thread.start()
+
+    def done(self):
+        return self.thread is None or not self.thread.is_alive()
+
+    # Returns an asset, loading it right now if nobody has yet. Images are converted to the display's
+    # pixel format here, on the main thread, the first time they're handed out
+    def __getitem__(self, name):
+        asset = self.ready.get(name)
+        if asset is not None or name in self.ready:
+            return asset
+        if self.atlas and name in self.atlas:
+            asset = self['atlas'].subsurface(self.atlas[name])
+            self.ready[name] = asset
+            return asset
+        if name not in self.loaded:
+            self.load(name, 'on demand')
+        asset = self.loaded[name]
+        if self.manifest[name][1] == 'image':
+            asset = asset.convert_alpha()
+            self.loaded[name] = asset  # No need to keep the unconverted pixels around as well
+        self.ready[name] = asset
+        return asset
+
+    def report(self):
+        total = sum(self.load_times.values())
+        print("Asset load times (%.1f ms total):" % total)
+        for name in sorted(self.load_times, key=self.load_times.get, reverse=True):
+            print("  %-24s %8.2f ms  %s" % (name, self.load_times[name], self.loaded_by[name]))
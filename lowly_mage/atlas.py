@@ -0,0 +1,58 @@
+import json
+import pygame
+from . import data_path
+from .assets import MANIFEST, ATLAS_INDEX, load_image
+
+'''Packs the game's sprites into one atlas image. Run this file whenever a sprite changes:
+
+    python -m lowly_mage.atlas
+
+It writes atlas.png and atlas.json, the index of where every sprite ended up. Sprites that get scaled
+are stored already scaled, so the game doesn't run any transforms when it starts. At runtime the asset
+loader decodes atlas.png once and hands out subsurfaces of it by name (see AssetLoader in assets.py).
+Full screen layers aren't packed: the battle layers are flattened into one background anyway, and the
+title is only ever drawn whole.'''
+
+ATLAS_SKIP = ('atlas', 'gametitle', 'arena', 'trees', 'bushes')
+PADDING = 1  # Keeps scaled or filtered sprites from picking up their neighbours' edges
+
+'''Shelf packing: sprites go left to right, tallest first, and a new shelf starts under the tallest
+sprite of the current one whenever a row is full. Returns the atlas size and each sprite's position.'''
+
+def pack(sizes, max_width=1024):
+    order = sorted(sizes, key=lambda name: (sizes[name][1], sizes[name][0]), reverse=True)
+    positions = {}
+    x = y = shelf_height = 0
+    width = 0
+    for name in order:
+        w, h = sizes[name]
+        if x and x + w > max_width:
+            x = 0
+            y += shelf_height + PADDING
+            shelf_height = 0
+        positions[name] = (x, y)
+        x += w + PADDING
+        width = max(width, x - PADDING)
+        shelf_height = max(shelf_height, h)
+    return (width, y + shelf_height), positions
+
+def build(image_path=data_path(MANIFEST['atlas'][0]), index_path=ATLAS_INDEX):
+    sprites = {}
+    for name, (file, kind, scale, group) in MANIFEST.items():
+        if kind == 'image' and name not in ATLAS_SKIP:
+            sprites[name] = load_image(data_path(file), scale)
+
+    size, positions = pack({name: sprite.get_size() for name, sprite in sprites.items()})
+    sheet = pygame.Surface(size, pygame.SRCALPHA)
+    regions = {}
+    for name, sprite in sprites.items():
+        sheet.blit(sprite, positions[name])
+        regions[name] = list(positions[name]) + list(sprite.get_size())
+    pygame.image.save(sheet, image_path)
+    with open(index_path, 'w') as index_file:
+        json.dump({'size': list(size), 'regions': regions}, index_file, sort_keys=True)
+    return size, regions
+
+if __name__ == '__main__':
+    size, regions = build()
+    print("Packed", len(regions), "sprites into a", size[0], "x", size[1], "atlas")
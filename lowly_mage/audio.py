@@ -0,0 +1,131 @@
+import time
+import pygame
+
+'''Music and sound effects. Music is streamed from disk with pygame.mixer.music instead of being decoded
+into a Sound, so a two minute track costs a small decode buffer instead of tens of megabytes of PCM.
+pygame only has one music stream, so switching tracks fades the old one out and the new one in once the
+mixer says the old one has stopped. Sound effects play on a fixed pool of reserved channels; when all of
+them are busy a new effect takes over the channel playing the least important (and then the oldest)
+effect, or is skipped if everything playing matters more.'''
+
+MUSIC_END = pygame.USEREVENT + 1
+
+# Starts pygame's mixer if it isn't running yet, returns False if there's no audio device to start it on
+def init_mixer():
+    if not pygame.mixer.get_init():
+        try:
+            pygame.mixer.init()
+        except pygame.error:
+            return False
+    return True
+
+# How much each effect matters when channels run out, higher wins
+EFFECT_PRIORITY = {
+    'selectionsound': 0,
+    'pressbutton': 1,
+    'blaster': 2
+}
+
+class AudioManager:
+    def __init__(self, assets, channels=4):
+        self.assets = assets
+        self.music = None  # Track that is playing or fading in
+        self.next_music = None  # Track waiting for the current one to fade out
+        self.fade_ms = 0
+        self.channels = []
+        self.voices = []  # (priority, start time) of whatever each channel was last given
+        self.peak_memory = 0
+        self.stolen = 0
+        self.skipped = 0
+        self.profiler = None  # Gets the time spent starting effects if set
+        self.reserved = channels
+        self.started = False
+
+    # The mixer is only started when the first music or effect is played, not when the manager is made
+    def start(self):
+        if self.started:
+            return
+        self.started = True
+        if init_mixer():
+            pygame.mixer.set_reserved(self.reserved)
+            self.channels = [pygame.mixer.Channel(i) for i in range(self.reserved)]
+            self.voices = [(0, 0.0)] * self.reserved
+            pygame.mixer.music.set_endevent(MUSIC_END)
+
+    # Switches the music, fading the old track out and the new one in over fade_ms milliseconds
+    def play_music(self, name, fade_ms=600):
+        self.start()
+        if not pygame.mixer.get_init() or name == (self.next_music or self.music):
+            return
+        self.fade_ms = fade_ms
+        if self.music and pygame.mixer.music.get_busy():
+            self.next_music = name
+            pygame.mixer.music.fadeout(fade_ms)  # MUSIC_END starts the next track once this finishes
+        else:
+            self.start_music(name)
+
+    def start_music(self, name):
+        self.music = name
+        self.next_music = None
+        try:
+            pygame.mixer.music.load(self.assets[name])
+            pygame.mixer.music.play(-1, fade_ms=self.fade_ms)
+        except pygame.error:
+            print("Failed to play music:", name)
+
+    def stop_music(self):
+        self.next_music = None
+        self.music = None
+        if pygame.mixer.get_init():
+            pygame.mixer.music.stop()
+
+    # Registered with the frame scheduler, picks up the mixer's note that a fade out has finished
+    def handle_events(self, events):
+        for event in events:
+            if event.type == MUSIC_END and self.next_music:
+                self.start_music(self.next_music)
+
+    def play(self, name, priority=None):
+        self.start()
+        if not self.channels:
+            return
+        start = time.perf_counter()
+        sound = self.assets[name]
+        if not sound:
+            return
+        if priority is None:
+            priority = EFFECT_PRIORITY.get(name, 0)
+
+        # A free channel if there is one, otherwise the least important and oldest voice
+        slot = None
+        for i, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                slot = i
+                break
+        if slot is None:
+            slot = min(range(len(self.channels)), key=lambda i: self.voices[i])
+            if self.voices[slot][0] > priority:
+                self.skipped += 1
+                return
+            self.stolen += 1
+        self.channels[slot].play(sound)
+        self.voices[slot] = (priority, time.perf_counter())
+        self.peak_memory = max(self.peak_memory, self.memory())
+        if self.profiler:
+            self.profiler.add('audio', time.perf_counter() - start)
+
+    # Bytes of decoded PCM held by the sound effects that have been loaded so far
+    def memory(self):
+        init = pygame.mixer.get_init()
+        if not init:
+            return 0
+        frequency, size, channels = init
+        total = 0
+        for asset in list(self.assets.loaded.values()):
+            if isinstance(asset, pygame.mixer.Sound):
+                total += int(asset.get_length() * frequency) * channels * (abs(size) // 8)
+        return total
+
+    def report(self):
+        self.peak_memory = max(self.peak_memory, self.memory())
+        print("Audio: effects %.2f MB now, %.2f MB peak, %d voices stolen, %d skipped" % (self.memory() / 1048576, self.peak_memory / 1048576, self.stolen, self.skipped))
@@ -0,0 +1,52 @@
+# Made from battle_data.json by python -m lowly_mage.logic, edit that and run it again instead
+
+SOURCE_CRC = 3729482012
+
+DATA = {'enemies_per_run': 3,
+ 'behaviors': ['aggressive', 'defensive', 'tactical', 'reckless'],
+ 'moves': [{'name': 'Staff Whack',
+            'damage': 15,
+            'cost': 0,
+            'kind': 'physical',
+            'icon': 'staffwhack',
+            'effect': 'light'},
+           {'name': 'Fireball',
+            'damage': 50,
+            'cost': 25,
+            'kind': 'magic',
+            'icon': 'wizardfireball',
+            'effect': 'fire'}],
+ 'potions': [{'name': 'Health Potion', 'amount': 50, 'kind': 'health', 'icon': 'healthpotion'},
+             {'name': 'Mana Potion', 'amount': 25, 'kind': 'mana', 'icon': 'manapotion'}],
+ 'enemies': [{'name': 'Goblin',
+              'health': 50,
+              'damage': 10,
+              'behaviors': ['aggressive', 'reckless'],
+              'image': 'goblin',
+              'attack_image': 'goblinattack',
+              'effect': 'poison'},
+             {'name': 'Knight',
+              'health': 100,
+              'damage': 25,
+              'behaviors': ['defensive', 'tactical'],
+              'image': 'knight',
+              'attack_image': 'knightattack',
+              'effect': 'light'},
+             {'name': 'Golem',
+              'health': 150,
+              'damage': 50,
+              'behaviors': ['defensive', 'aggressive'],
+              'image': 'golem',
+              'attack_image': 'golemattack',
+              'effect': 'lightning'},
+             {'name': 'Dragon',
+              'health': 200,
+              'damage': 75,
+              'behaviors': ['tactical', 'aggressive'],
+              'image': 'dragon',
+              'attack_image': 'dragonattack',
+              'effect': 'fire'}],
+ 'effectiveness': {'Goblin': {'Staff Whack': 1.0, 'Fireball': 1.0},
+                   'Knight': {'Staff Whack': 1.0, 'Fireball': 1.0},
+                   'Golem': {'Staff Whack': 1.0, 'Fireball': 1.0},
+                   'Dragon': {'Staff Whack': 1.0, 'Fireball': 1.0}}}
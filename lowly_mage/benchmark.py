@@ -0,0 +1,238 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+# The benchmark never opens a real window or audio device
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+from . import ROOT
+from .frame_clock import FrameScheduler
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+'''Headless performance benchmark. Each screen of the game is driven with scripted key presses instead of
+a keyboard, frames are drawn as fast as possible, and the results are written as JSON:
+
+    python -m lowly_mage.benchmark --output bench.json
+    python -m lowly_mage.benchmark --output new.json --baseline bench.json
+
+With --baseline the run fails (exit code 1) if any timing or memory number got worse than the baseline
+by more than --tolerance. Recorded for every screen are the frame time percentiles and the time from a
+key press being handed to the screen to the frame that shows it; time to first frame is measured in a
+fresh process so it includes starting Python, importing pygame and loading the title screen.'''
+
+FIRST_FRAME_MARKER = 'first frame presented'
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {'count': 0}
+    def pick(p):
+        return values[min(len(values) - 1, int(len(values) * p))]
+    return {
+        'count': len(values),
+        'mean_ms': sum(values) / len(values),
+        'p50_ms': pick(0.50),
+        'p95_ms': pick(0.95),
+        'p99_ms': pick(0.99),
+        'max_ms': values[-1]
+    }
+
+def key(name):
+    return pygame.event.Event(pygame.KEYDOWN, key=getattr(pygame, 'K_' + name), mod=0, unicode='', scancode=0)
+
+'''Hands the screens one frame's worth of scripted events at a time instead of reading the real event
+queue (so it never blocks), and files every frame's time under the screen that drew it. Frames aren't
+capped, so the times are what drawing each frame actually costs, but the game is told every frame took
+FRAME_MS, so animations and turns play out over the same number of frames they would at 60 FPS.'''
+
+FRAME_MS = 1000 / 60
+
+class ScriptedScheduler(FrameScheduler):
+    def __init__(self, game):
+        FrameScheduler.__init__(self, target_fps=0, history=1000000)
+        self.game = game
+        self.listeners = list(game.frames.listeners)
+        self.script = []
+        self.stack = None
+        self.label = None  # (state, name) the frames are being recorded for
+        self.results = {}
+        self.latencies = {}
+        self.event_time = None
+
+    def run(self, stack, label, script):
+        self.stack = stack
+        self.label = label
+        self.script = list(script)
+
+    def events(self):
+        # Once the script runs out the game is told to quit
+        events = self.script.pop(0) if self.script else [pygame.event.Event(pygame.QUIT)]
+        self.dt = FRAME_MS
+        if events:
+            self.event_time = time.perf_counter()
+        for listener in self.listeners:
+            listener(events)
+        return events
+
+    def present(self, rects=None):
+        FrameScheduler.present(self, rects)
+        if self.label and self.label[0] == self.stack.top().state:
+            self.results.setdefault(self.label[1], []).append(self.frame_times[-1])
+            if self.event_time is not None:
+                self.latencies.setdefault(self.label[1], []).append((time.perf_counter() - self.event_time) * 1000)
+        self.event_time = None
+
+# Runs the game's scenes until the script runs out (which quits) or the game leaves the screen
+def play(stack, scheduler, label, script, stop_when_left=False):
+    scheduler.run(stack, label, script)
+    while scheduler.script and stack.frame():
+        if stop_when_left and stack.top().state != label[0]:
+            break
+
+# A new game on the title screen with the given scene pushed on top of it
+def reset(game, scheduler, seed, scene=None):
+    random.seed(seed)
+    stack = game.new_game(scheduler)
+    if scene:
+        stack.push(scene(stack.top().session))
+    return stack
+
+def run_screens(frames, seed):
+    from . import game
+    game.assets.load_group('battle')  # Steady state frames, loading is covered by time to first frame
+    scheduler = ScriptedScheduler(game)
+    state = game.GameState
+
+    def navigation(keys, count, every=5):
+        return [[key(keys[(i // every) % len(keys)])] if i % every == 0 else [] for i in range(count)]
+
+    play(reset(game, scheduler, seed), scheduler, (state.MAIN_SCREEN, 'MAIN_SCREEN'), navigation(['RIGHT', 'LEFT'], frames))
+    play(reset(game, scheduler, seed), scheduler, (state.BATTLE_SCREEN, 'BATTLE_SCREEN:attacks'), [[key('RETURN')]] + navigation(['DOWN', 'UP'], frames))
+    play(reset(game, scheduler, seed), scheduler, (state.BATTLE_SCREEN, 'BATTLE_SCREEN:potions'), [[key('RETURN')], [key('TAB')]] + navigation(['DOWN', 'UP'], frames))
+
+    # Whole turns with the attack animations, a Staff Whack every 60 frames, which is time for the whole turn to play out
+    stack = reset(game, scheduler, seed)
+    session = stack.top().session
+    script = [[key('RETURN')]] + navigation(['RETURN'], frames, every=60)
+    play(stack, scheduler, (state.BATTLE_SCREEN, 'BATTLE_SCREEN:turns'), script, stop_when_left=True)
+    # Every enemy attack counts up turns_since_last_attack, so that adds up to the enemy turns played. The
+    # enemy answers every attack that was sent before the run ended, except one that won it.
+    attacks = sum(1 for events in script[1:len(script) - len(scheduler.script)] if events)
+    expected = attacks - (stack.top().state == state.VICTORY)
+    enemy_turns = sum(enemy.turns_since_last_attack for enemy in session.enemies)
+    if enemy_turns != expected or not enemy_turns:
+        raise RuntimeError("BATTLE_SCREEN:turns played %d enemy turns, expected %d" % (enemy_turns, expected))
+
+    for scene, label in ((game.GameOverScene, 'GAME_OVER'), (game.VictoryScene, 'VICTORY')):
+        play(reset(game, scheduler, seed, scene), scheduler, (scene.state, label), [[] for _ in range(frames)] + [[key('SPACE')]], stop_when_left=True)
+
+    return ({label: percentiles(times) for label, times in scheduler.results.items()},
+            {label: percentiles(times) for label, times in scheduler.latencies.items()})
+
+# Starts the game in a new process and times how long it takes until the first frame is on screen
+def time_to_first_frame(runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        child = subprocess.Popen([sys.executable, '-m', 'lowly_mage.benchmark', '--first-frame'], stdout=subprocess.PIPE, universal_newlines=True, cwd=ROOT)
+        for line in child.stdout:
+            if line.strip() == FIRST_FRAME_MARKER:
+                times.append((time.perf_counter() - start) * 1000)
+                break
+        child.stdout.close()
+        child.wait()
+    return percentiles(times)
+
+def first_frame():
+    from . import game
+    game.new_game().frame()
+    print(FIRST_FRAME_MARKER, flush=True)
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak / (1048576 if sys.platform == 'darwin' else 1024)
+
+# The numbers checked for regressions. Maximums and p99 over a few hundred sub-millisecond frames are
+# mostly scheduler noise, so they are reported but not compared
+COMPARED = ('p50_ms', 'p95_ms', 'peak_rss_mb')
+
+# Every compared number in the results, as {'screens.MAIN_SCREEN.p95_ms': value}
+def metrics(results, prefix=''):
+    found = {}
+    for name, value in results.items():
+        if isinstance(value, dict):
+            found.update(metrics(value, prefix + name + '.'))
+        elif isinstance(value, (int, float)) and name in COMPARED:
+            found[prefix + name] = value
+    return found
+
+# Anything more than tolerance worse than the baseline, with a little slack so tiny times can wobble
+def regressions(results, baseline, tolerance, slack_ms=0.1):
+    current = metrics(results)
+    worse = []
+    for name, before in metrics(baseline).items():
+        after = current.get(name)
+        if after is not None and after > before * (1 + tolerance) + slack_ms:
+            worse.append((name, before, after))
+    return worse
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless frame time and startup benchmark.')
+    parser.add_argument('--output', default='bench.json')
+    parser.add_argument('--baseline', help='earlier results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown, 0.2 is 20%%')
+    parser.add_argument('--frames', type=int, default=300, help='frames per screen')
+    parser.add_argument('--startup-runs', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--first-frame', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.first_frame:
+        first_frame()
+        return 0
+
+    startup = time_to_first_frame(args.startup_runs)
+    screens, latency = run_screens(args.frames, args.seed)
+    results = {
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'platform': platform.platform(),
+        'time_to_first_frame': startup,
+        'screens': screens,
+        'event_to_present': latency,
+        'peak_rss_mb': peak_rss_mb()
+    }
+    with open(args.output, 'w') as output:
+        json.dump(results, output, indent=2, sort_keys=True)
+
+    print("Time to first frame: %.1f ms (median of %d)" % (startup.get('p50_ms', 0), startup['count']))
+    for label, stats in sorted(screens.items()):
+        print("%-24s p50 %6.2f ms  p95 %6.2f ms  p99 %6.2f ms  (%d frames)" % (label, stats['p50_ms'], stats['p95_ms'], stats['p99_ms'], stats['count']))
+    if results['peak_rss_mb'] is not None:
+        print("Peak RSS: %.1f MB" % results['peak_rss_mb'])
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            worse = regressions(results, json.load(baseline_file), args.tolerance)
+        for name, before, after in worse:
+            print("REGRESSION %s: %.3f -> %.3f" % (name, before, after))
+        if worse:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
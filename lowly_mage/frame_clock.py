@@ -0,0 +1,91 @@
+import os
+import time
+from collections import deque
+import pygame
+
+'''Paces the game loop. Every screen asks the scheduler for its events and hands the finished frame back
+to it, and the scheduler caps the frame rate at TARGET_FPS. When the last frame didn't handle any input
+and nothing asked for a redraw, nothing on screen can change, so instead of spinning it sleeps until the
+next event arrives. Frame times are measured without that idle wait so they show real work only.'''
+
+# Frame rate cap, can be changed with the MAGE_FPS environment variable
+TARGET_FPS = int(os.environ.get('MAGE_FPS', 60))
+
+class FrameScheduler:
+    def __init__(self, target_fps=TARGET_FPS, history=600):
+        self.target_fps = target_fps
+        self.clock = pygame.time.Clock()
+        self.frame_times = deque(maxlen=history)  # Milliseconds of work for each recent frame
+        self.frames = 0
+        self.idle_frames = 0
+        self.needs_redraw = True  # The first frame always has to be drawn
+        self.listeners = []  # Called with every batch of events before the screen sees them
+        self.profiler = None  # Times polling and presenting and draws its overlay on each frame if set
+        self.waited = 0.0
+        self.frame_start = time.perf_counter()
+        self.dt = 0  # Milliseconds the last frame took, not counting time spent idle, for animations
+
+    # Asks for the next frame to be drawn even if no input arrives, for things like animations
+    def invalidate(self):
+        self.needs_redraw = True
+
+    # Returns this frame's events, blocking until there is one if the screen is idle
+    def events(self):
+        start = time.perf_counter()
+        if self.needs_redraw:
+            events = pygame.event.get()
+        else:
+            wait_start = time.perf_counter()
+            first = pygame.event.wait()
+            self.waited += time.perf_counter() - wait_start
+            self.idle_frames += 1
+            events = [first] + pygame.event.get() if first.type != pygame.NOEVENT else pygame.event.get()
+        for listener in self.listeners:
+            listener(events)
+        if self.profiler:
+            self.profiler.add('events', time.perf_counter() - start - self.waited)
+        # Whatever an event changed still needs to be shown, so don't go idle straight after one
+        self.needs_redraw = bool(events)
+        return events
+
+    # Shows the frame (the whole screen, or just the given rectangles) and waits out the rest of the frame
+    def present(self, rects=None):
+        if self.profiler:
+            overlay = self.profiler.draw_overlay(pygame.display.get_surface())
+            if overlay and rects is not None:
+                rects = rects + [overlay]
+        start = time.perf_counter()
+        if rects is None:
+            pygame.display.flip()
+        elif rects:
+            pygame.display.update(rects)
+        now = time.perf_counter()
+        if self.profiler:
+            self.profiler.add('present', now - start)
+        self.frame_times.append((now - self.frame_start - self.waited) * 1000)
+        self.frames += 1
+        self.clock.tick(self.target_fps)
+        start = time.perf_counter()
+        self.dt = (start - self.frame_start - self.waited) * 1000
+        self.frame_start = start
+        self.waited = 0.0
+        if self.profiler:
+            self.profiler.end_frame(self.frame_times[-1])
+
+    def stats(self):
+        times = sorted(self.frame_times)
+        if not times:
+            return {'frames': self.frames, 'idle_frames': self.idle_frames}
+        return {
+            'frames': self.frames,
+            'idle_frames': self.idle_frames,
+            'target_fps': self.target_fps,
+            'avg_ms': sum(times) / len(times),
+            'p50_ms': times[len(times) // 2],
+            'p95_ms': times[min(len(times) - 1, int(len(times) * 0.95))],
+            'max_ms': times[-1],
+            'fps': self.clock.get_fps()
+        }
+
+    def report(self):
+        print("Frame times:", ", ".join(key + "=" + (("%.2f" % value) if isinstance(value, float) else str(value)) for key, value in self.stats().items()))
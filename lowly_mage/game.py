@@ -0,0 +1,366 @@
+import pygame
+import math
+import os
+from .frame_clock import FrameScheduler
+from .renderer import composite
+from .assets import AssetLoader
+from .audio import AudioManager
+from .animation import Timeline, Tween, SpriteSwap, ease_out
+from .particles import ParticleSystem, Trail
+from .profiler import from_environment, surface_memory
+from .replay import Recorder
+from . import snapshot
+from . import rendering
+from .rendering import blit, draw_text, text_cache
+from .solver import SolverTable, ACTIONS, hints
+from .scenes import Scene, SceneStack
+from .logic import Player, MOVES, POTION_TYPES, create_enemies, use_attack, use_potion, enemy_turn
+
+'''The game itself: the scenes, and what they share. Importing this module doesn't start pygame or open a
+window, that happens in open_window() when the first game is made with new_game(). The drawing is in
+rendering.py, and the game is started with python -m lowly_mage (see __main__.py).'''
+
+# Paces every screen and goes idle when nothing can change
+frames = FrameScheduler()
+
+# Per-frame timings and counters, F3 shows them in the corner (see profiler.py)
+profiler = from_environment()
+frames.profiler = profiler
+frames.listeners.append(profiler.handle_events)
+
+# Game states reflect the section of the code the user is in, every scene says which one it is
+class GameState:
+    MAIN_SCREEN = 0
+    BATTLE_SCREEN = 1
+    GAME_OVER = 2
+    VICTORY = 3
+
+# Every image and sound, loaded when the window opens or when first asked for (see assets.py)
+assets = AssetLoader()
+
+# Music streams from disk and effects share a small pool of channels, the mixer starts with the first sound (see audio.py)
+audio = AudioManager(assets)
+audio.profiler = profiler
+frames.listeners.append(audio.handle_events)
+
+# Attacks and potions, with their numbers and icons, come from battle_data.json (see logic.py)
+attacks = MOVES
+potions = POTION_TYPES
+
+# Spell and hit effects, drawn on top of the widgets every frame they're alive (see particles.py)
+particles = ParticleSystem(assets)
+WIZARD_CENTER = (100, 250)
+ENEMY_CENTER = (330, 290)
+
+profiler.watch('renders', lambda: text_cache.misses)
+profiler.watch('blits', lambda: rendering.blit_count + text_cache.blits + (rendering.battle_view.blits if rendering.battle_view else 0) + particles.blits)
+profiler.memory = lambda: surface_memory(list(assets.loaded.values()) + list(text_cache.surfaces.values()) + ([rendering.battle_view.background] if rendering.battle_view else [])) + audio.memory()
+
+# The hints come from the solved battles in solver.bin (see solver.py), a lookup is a binary search
+solver_table = SolverTable()
+NO_HINTS = ('',) * len(ACTIONS)  # While the turn plays out
+
+# Opens the window the first time it's needed, and loads only what the title screen needs before the first frame
+def open_window():
+    if rendering.screen is None:
+        rendering.open_window(assets)
+        profiler.on_overlay.append(rendering.battle_view.damage) # The overlay draws over the widgets, so they repaint where it was
+        assets.load_group('title')
+
+'''Everything that carries over from one screen to the next: the player (who keeps their potions between
+runs) and the run in progress, which is the enemies rolled when Play was chosen and how far through them
+the player is.'''
+
+class Session:
+    def __init__(self, save_path=None):
+        self.player = Player()
+        self.enemies = []
+        self.current_enemy_index = 0
+        self.save_path = save_path  # Where the run is saved at the start of every turn, None to not save
+        self.resumed = False  # True while there's a loaded run waiting for Continue on the title screen
+
+    def new_run(self):
+        self.enemies = create_enemies()
+        self.current_enemy_index = 0
+
+    # Picks up a run saved by autosave(), random module and all (see snapshot.py)
+    def resume(self):
+        self.player, self.enemies, self.current_enemy_index = snapshot.load(self.save_path)
+        self.resumed = True
+
+    def autosave(self):
+        if self.save_path:
+            snapshot.save(self.save_path, self.player, self.enemies, self.current_enemy_index)
+
+    # The run is over, there's nothing left to continue
+    def clear_save(self):
+        if self.save_path and os.path.exists(self.save_path):
+            os.remove(self.save_path)
+
+class MainScene(Scene):
+    state = GameState.MAIN_SCREEN
+
+    def __init__(self, session):
+        self.session = session
+        self.selection_horiz = 0
+
+    ''' When the user chooses to press enter while selection horiz = 0, it will reflect them hovering
+    over the option "play" in the title screen. If they select anything else (the only other option
+    is quit, we don't have to specify which value selection horiz is in), the game will quit.'''
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_LEFT:
+                self.selection_horiz = (self.selection_horiz - 1) % 2
+                audio.play('selectionsound')
+            elif event.key == pygame.K_RIGHT:
+                self.selection_horiz = (self.selection_horiz + 1) % 2
+                audio.play('selectionsound')
+            elif event.key == pygame.K_RETURN:
+                if self.selection_horiz == 0:  # Play, or Continue a saved run
+                    audio.play_music('battle')
+                    if self.session.resumed:
+                        self.session.resumed = False
+                    else:
+                        self.session.new_run()
+                    self.stack.push(BattleScene(self.session))
+                else:  # Quit
+                    self.stack.quit()
+
+    def render(self, alpha):
+        rendering.screen.fill((135, 206, 235))
+        blit(assets['gametitle'], (0, 0))
+        
+        # Draw buttons
+        play_color = (255, 255, 0) if self.selection_horiz == 0 else (255, 255, 255)
+        quit_color = (255, 255, 0) if self.selection_horiz == 1 else (255, 255, 255)
+        
+        draw_text("Continue" if self.session.resumed else "Play", 70, 305, play_color)
+        draw_text("Quit", 270, 305, quit_color)
+        return None
+
+'''A turn starts with the player picking from the menu. Using an attack starts the attack animations on
+the timeline, and the rest of the turn (the enemy's attack) happens in the animations' completion
+callbacks. Once the last animation has finished update() checks if anyone has won and the next turn
+starts. Drinking a potion doesn't use up the turn, it just starts a new one.'''
+
+class BattleScene(Scene):
+    state = GameState.BATTLE_SCREEN
+
+    def __init__(self, session):
+        self.session = session
+        self.timeline = Timeline()
+        # What the battle animations are currently showing in place of the normal sprites and values, None means normal
+        self.poses = {'wizard': None, 'enemy': None, 'enemy_health': None}
+        self.previous_enemy_health = None  # Where the health bar was one logic step ago, to draw in between
+        self.effects = Timeline()  # Particle effects, kept apart so they never hold up the turn
+        self.particle_rect = None  # Where the particles were drawn last frame
+        particles.clear()
+        self.new_turn()
+
+    def enter(self):
+        view = rendering.battle_view
+        if view.background is None:
+            view.background = composite([assets['arena'], assets['trees'], assets['bushes']], (rendering.WIDTH, rendering.HEIGHT))
+        view.invalidate() # Whatever was on screen before, the first battle frame has to repaint everything
+
+    def new_turn(self):
+        self.menu_type = 'attacks'  # 'attacks' or 'potions'
+        self.selection = 0
+        self.selecting = True  # False while the turn plays out
+        self.current_enemy = self.session.enemies[self.session.current_enemy_index]
+        # Looked up once a turn, in the middle of a turn the state isn't one solver.bin has and would have to be solved on the spot
+        self.hints = self.look_up_hints()
+        self.session.autosave()  # Between turns nothing is half done, so this is where the run can be picked up from
+
+    # None while a state solver.bin doesn't have is being solved in the background, the menu shows no hints till then
+    def look_up_hints(self):
+        return hints(solver_table, self.session.player, self.current_enemy, self.session.current_enemy_index, wait=False)
+
+    def busy(self):
+        return self.timeline.busy() or self.effects.busy() or particles.busy() or (self.selecting and self.hints is None)
+
+    def handle_event(self, event):
+        if event.type != pygame.KEYDOWN:
+            return
+        player = self.session.player
+        if event.key == pygame.K_TAB:
+            self.menu_type = 'potions' if self.menu_type == 'attacks' else 'attacks' # The menus will switch from one to the other when the player presses the tab key
+            self.selection = 0 # The selection will be reverted to 0
+            audio.play('selectionsound')
+        elif event.key == pygame.K_UP:
+            self.selection = (self.selection - 1) % len(attacks if self.menu_type == 'attacks' else potions) # Changes the selection value if the user goes up or down
+            audio.play('selectionsound')
+        elif event.key == pygame.K_DOWN:
+            self.selection = (self.selection + 1) % len(attacks if self.menu_type == 'attacks' else potions)
+            audio.play('selectionsound')
+        elif event.key == pygame.K_RETURN and self.selecting: # Nothing can be used while the turn is still playing out
+            if self.menu_type == 'attacks':
+                health_before = self.current_enemy.health
+                move = attacks[self.selection]
+                if use_attack(player, self.current_enemy, move): # If the player has enough mana, the mana will be consumed if the user casts an ability
+                    audio.play('blaster')
+                    self.move_effect(move)
+
+                    # Show attack animation, the enemy's health bar drains while the wizard attacks
+                    self.timeline.play(SpriteSwap(self.poses, 'wizard', 'wizardattack', 300, on_complete=self.enemy_turn))
+                    self.timeline.play(Tween(300, health_before, self.current_enemy.health, on_update=lambda value: self.poses.update(enemy_health=value), easing=ease_out, on_complete=lambda: self.poses.update(enemy_health=None)))
+
+                    self.selecting = False
+            else:
+                if use_potion(player, potions[self.selection]): # If the user uses a potion, the amount of potions they have will decrease and their health or mana will go up
+                    # Potion use doesn't consume turn, the widgets pick up the new health and mana on their own
+                    self.new_turn()
+
+    # Spells fly across the arena and burst on the enemy, anything else just bursts where it hits
+    def move_effect(self, move):
+        if not move.effect:
+            return
+        impact = lambda: particles.emit(move.effect, 600 if move.kind == 'magic' else 250, *ENEMY_CENTER, jitter=10.0)
+        if move.kind == 'magic':
+            self.effects.play(Trail(particles, move.effect, WIZARD_CENTER, ENEMY_CENTER, 300, 4000, on_complete=impact))
+        else:
+            self.effects.play(Tween(200, on_complete=impact)) # Waits for the staff to come down
+
+    def enemy_turn(self):
+        session = self.session
+        # Moves on to the next enemy if this one is defeated, then the enemy attacks (see logic.py)
+        session.current_enemy_index, enemy_damage = enemy_turn(session.player, session.enemies, session.current_enemy_index)
+        if enemy_damage > 0:
+            # Show enemy attack animation
+            self.timeline.play(SpriteSwap(self.poses, 'enemy', self.current_enemy.attack_image, 500))
+            if self.current_enemy.effect:
+                particles.emit(self.current_enemy.effect, 500, *WIZARD_CENTER, direction=math.pi, spread=math.pi, jitter=8.0)
+
+    def update(self, dt):
+        if self.selecting and self.hints is None:
+            self.hints = self.look_up_hints()
+        self.previous_enemy_health = self.poses['enemy_health']
+        self.timeline.update(dt)
+        self.effects.update(dt)
+        particles.update(dt)
+        if self.selecting or self.timeline.busy():
+            return
+        # The turn is over
+        session = self.session
+        if session.player.health <= 0: # Check if player is defeated
+            session.clear_save()
+            self.stack.replace(GameOverScene(session))
+        elif session.current_enemy_index >= len(session.enemies): # Check if all enemies are defeated
+            session.clear_save()
+            self.stack.replace(VictoryScene(session))
+        else:
+            self.new_turn()
+
+    # Hands every battle widget its current state and returns the rectangles that changed
+    def render(self, alpha):
+        player = self.session.player
+        view = rendering.battle_view
+        current_enemy = self.current_enemy
+        enemy_health = self.poses['enemy_health']
+        if enemy_health is None:
+            enemy_health = current_enemy.health
+        elif self.previous_enemy_health is not None:
+            # The bar drains smoothly even when frames come faster than logic steps
+            enemy_health = self.previous_enemy_health + (enemy_health - self.previous_enemy_health) * alpha
+        view.set('menu', (self.menu_type, self.selection, self.hints if self.selecting and self.hints else NO_HINTS, player.health_potions, player.mana_potions))
+        view.set('wizard', self.poses['wizard'] or 'wizardstationary')
+        view.set('enemy', self.poses['enemy'] or current_enemy.image)
+        view.set('player_health_bar', (player.health, player.max_health))
+        view.set('player_mana_bar', (player.mana, player.max_mana))
+        view.set('enemy_health_bar', (enemy_health, current_enemy.max_health))
+        view.set('player_mana', (player.mana, player.max_mana))
+        view.set('player_health', (player.health, player.max_health))
+        view.set('enemy_behavior', current_enemy.behavior_type)
+        view.set('enemy_health', (current_enemy.health, current_enemy.max_health))
+        view.set('enemy_name', current_enemy.name)
+        if self.particle_rect:
+            view.damage(self.particle_rect) # Wherever the particles were gets repainted
+        rects = view.render()
+        self.particle_rect = particles.draw(rendering.screen)
+        if self.particle_rect:
+            rects.append(self.particle_rect)
+        return rects
+
+'''When the user's health drops to or below 0, they will have lost the game, and will see the game over
+screen. The screen will be filled with black and the text GAME OVER and Press any key to continue will
+appear in red. After this, the scene is popped, and in doing so, the user will be sent back to the main
+screen underneath it. The health and mana of the player is also reverted to max. When the user defeats
+all the enemies in the game, the victory screen shows instead, with bright green text with the word
+VICTORY! The rest is the same.'''
+
+class ResultScene(Scene):
+    title = ""
+    color = (255, 255, 255)
+
+    def __init__(self, session):
+        self.session = session
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            audio.play_music('title')
+            # Reset player
+            player = self.session.player
+            player.health = player.max_health
+            player.mana = player.max_mana
+            self.stack.pop()
+
+    def render(self, alpha):
+        rendering.screen.fill((0, 0, 0))
+        draw_text(self.title, 150, 180, self.color)
+        draw_text("Press any key to continue", 120, 220)
+        return None
+
+class GameOverScene(ResultScene):
+    state = GameState.GAME_OVER
+    title = "GAME OVER"
+    color = (255, 0, 0)
+
+class VictoryScene(ResultScene):
+    state = GameState.VICTORY
+    title = "VICTORY!"
+    color = (0, 255, 0)
+
+# A fresh game on the title screen, driven by the given frame scheduler
+def new_game(scheduler=None, session=None):
+    open_window()
+    stack = SceneStack(scheduler or frames, profiler)
+    stack.push(MainScene(session or Session()))
+    return stack
+
+# Where a session ended up, stored at the end of recordings so replays can be checked against it
+def session_outcome(stack):
+    scene = stack.top()
+    player = scene.session.player
+    return (scene.state, player.health, player.mana, player.health_potions, player.mana_potions, scene.session.current_enemy_index)
+
+# Main game loop, started by __main__.py, tools like benchmark.py build their own games with new_game()
+def main():
+    recorder = None
+    if os.environ.get('MAGE_RECORD'): # Seeds the random module and saves every frame's input (see replay.py)
+        recorder = Recorder(os.environ['MAGE_RECORD'], frames)
+        frames.listeners.append(recorder.record)
+    # Runs are saved at the start of every turn and one left unfinished is offered on the title screen. A
+    # recording has to start from its own seed, so it never continues a save.
+    session = Session(os.environ.get('MAGE_SAVE', 'autosave.msav'))
+    if not recorder and session.save_path and os.path.exists(session.save_path):
+        try:
+            session.resume()
+        except (OSError, ValueError) as error:
+            print("Couldn't continue from %s: %s" % (session.save_path, error))
+            session = Session(session.save_path)
+    stack = new_game(session=session)
+    audio.play_music('title')
+    assets.load_in_background('battle') # Everything the battles need loads while the title music plays
+    stack.run()
+
+    if os.environ.get('MAGE_FRAME_STATS'):
+        frames.report()
+        text_cache.report()
+    if os.environ.get('MAGE_ASSET_STATS'):
+        assets.report()
+        audio.report()
+    if recorder:
+        recorder.close(session_outcome(stack))
+    profiler.close()
+    pygame.quit()
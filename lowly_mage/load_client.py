@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import collections
+import json
+import random
+import time
+
+'''Load generator for server.py. Keeps --sessions battles going at once, spread over --connections
+connections, each one played to the end by a simple policy and then replaced by a new one, for
+--duration seconds. Then it prints how many battles finished per second and the latency of every turn
+(the time from sending a request to getting its reply), which is what a player would feel:
+
+    python -m lowly_mage.server &
+    python -m lowly_mage.load_client --sessions 1000 --connections 50 --duration 10'''
+
+# Sends requests down one connection and matches up the replies, which come back in the order they were asked
+class Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.waiting = collections.deque()
+        self.reading = asyncio.ensure_future(self.read_replies())
+
+    async def read_replies(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            self.waiting.popleft().set_result(json.loads(line))
+        for future in self.waiting:
+            future.set_exception(ConnectionError("The server closed the connection"))
+
+    async def request(self, message):
+        future = asyncio.get_running_loop().create_future()
+        self.waiting.append(future)
+        self.writer.write(json.dumps(message).encode() + b'\n')
+        await self.writer.drain()
+        reply = await future
+        if not reply['ok']:
+            raise RuntimeError(reply['error'])
+        return reply
+
+    async def close(self):
+        self.writer.close()
+        self.reading.cancel()
+
+# Drinks when low, casts Fireball whenever there's the mana for it and whacks otherwise
+def choose(state):
+    if state['health'] < 40 and state['health_potions'] > 0:
+        return {'op': 'potion', 'potion': 0}
+    if state['mana'] < 25 and state['mana_potions'] > 0:
+        return {'op': 'potion', 'potion': 1}
+    return {'op': 'attack', 'move': 1 if state['mana'] >= 25 else 0}
+
+class Stats:
+    def __init__(self):
+        self.latencies = []  # Seconds, one per request that played a turn or drank a potion
+        self.battles = 0
+        self.won = 0
+
+async def play(connection, stats, rng, deadline):
+    while time.perf_counter() < deadline:
+        reply = await connection.request({'op': 'new', 'seed': rng.getrandbits(32)})
+        session = reply['session']
+        state = reply['state']
+        while state['result'] is None:
+            message = choose(state)
+            message['session'] = session
+            start = time.perf_counter()
+            state = (await connection.request(message))['state']
+            stats.latencies.append(time.perf_counter() - start)
+        stats.battles += 1
+        stats.won += state['result'] == 'won'
+        await connection.request({'op': 'close', 'session': session})
+
+async def open_connection(args):
+    if args.unix:
+        return await asyncio.open_unix_connection(args.unix)
+    return await asyncio.open_connection(args.host, args.port)
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+async def run(args):
+    connections = [Connection(*await open_connection(args)) for _ in range(args.connections)]
+    stats = Stats()
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    deadline = start + args.duration
+    # Each session plays one battle after another on its own, so --sessions battles are always going at once
+    await asyncio.gather(*[play(connections[i % len(connections)], stats, random.Random(rng.getrandbits(32)), deadline)
+                           for i in range(args.sessions)])
+    elapsed = time.perf_counter() - start
+    for connection in connections:
+        await connection.close()
+
+    latencies = sorted(stats.latencies)
+    print("%d concurrent sessions over %d connections for %.1f s" % (args.sessions, len(connections), elapsed))
+    print("%d battles (%.0f sessions/s, %.1f%% won), %d turns (%.0f/s)" % (
+        stats.battles, stats.battles / elapsed, stats.won * 100.0 / stats.battles if stats.battles else 0.0,
+        len(latencies), len(latencies) / elapsed))
+    if latencies:
+        print("Turn latency: mean %.2f ms, p50 %.2f ms, p95 %.2f ms, p99 %.2f ms, max %.2f ms" % (
+            sum(latencies) / len(latencies) * 1000, percentile(latencies, 0.5) * 1000, percentile(latencies, 0.95) * 1000,
+            percentile(latencies, 0.99) * 1000, latencies[-1] * 1000))
+
+def main():
+    parser = argparse.ArgumentParser(description='Play many battles against server.py at once and time them.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='connect to this Unix socket instead of TCP')
+    parser.add_argument('--sessions', type=int, default=1000, help='battles going at once')
+    parser.add_argument('--connections', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds to keep starting new battles')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == '__main__':
+    main()
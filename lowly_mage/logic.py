@@ -0,0 +1,292 @@
+import os
+import random
+import zlib
+from . import data_path
+
+'''Battle rules for Struggle of a Lowly Mage. Nothing in here touches pygame, so the same rules can be used
+by the game itself and by anything that wants to run battles without a window (like the simulator in
+sim.py). Enemies only carry the asset names of their images (see assets.py) so the game knows
+what to draw.
+
+Every move, potion and enemy is defined in battle_data.json and loaded into the registry below once, when
+this module is imported. Each kind of thing gets a small record class with __slots__ and an integer id
+(its position in the file), and everything that needs looking up during a battle is looked up by id:
+behaviors are functions in a table, and how effective each move is against each enemy is a precomputed
+matrix.'''
+
+DATA_PATH = data_path('battle_data.json')
+DATA_MODULE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'battle_data.py')
+
+class Move:
+    __slots__ = ('id', 'name', 'damage', 'cost', 'kind', 'icon', 'effect')
+
+    def __init__(self, id, name, damage, cost, kind, icon=None, effect=None):
+        self.id = id
+        self.name = name
+        self.damage = damage
+        self.cost = cost  # Mana
+        self.kind = kind  # 'physical' or 'magic'
+        self.icon = icon
+        self.effect = effect  # Particle sprite the move hits with (see particles.py)
+
+class PotionType:
+    __slots__ = ('id', 'name', 'amount', 'kind', 'icon')
+
+    def __init__(self, id, name, amount, kind, icon=None):
+        self.id = id
+        self.name = name
+        self.amount = amount
+        self.kind = kind  # 'health' or 'mana'
+        self.icon = icon
+
+class EnemyType:
+    __slots__ = ('id', 'name', 'health', 'damage', 'behaviors', 'image', 'attack_image', 'effect')
+
+    def __init__(self, id, name, health, damage, behaviors, image=None, attack_image=None, effect=None):
+        self.id = id
+        self.name = name
+        self.health = health
+        self.damage = damage
+        self.behaviors = behaviors  # Ids of the behaviors this type can roll
+        self.image = image
+        self.attack_image = attack_image
+        self.effect = effect
+
+def whole(value):
+    return int(value) if float(value).is_integer() else float(value)
+
+'''Importing the json module takes longer than everything else in here put together (it brings in the
+regular expression engine), so the same data is also kept as a plain Python literal in battle_data.py,
+next to this file, which Python imports like any other module. It's made from battle_data.json by
+
+    python -m lowly_mage.logic
+
+and remembers the CRC-32 of the file it was made from. If battle_data.json has changed since, the JSON is
+parsed instead, so the rules are never out of date, it just takes a little longer to start.'''
+
+def read_data(path=DATA_PATH):
+    with open(path, 'rb') as data_file:
+        raw = data_file.read()
+    if path == DATA_PATH:
+        try:
+            from . import battle_data
+        except ImportError:
+            battle_data = None  # Not made yet
+        if battle_data and battle_data.SOURCE_CRC == zlib.crc32(raw):
+            return battle_data.DATA
+    import json
+    return json.loads(raw)
+
+def write_data_module(path=DATA_PATH, output=DATA_MODULE):
+    import json
+    import pprint
+    with open(path, 'rb') as data_file:
+        raw = data_file.read()
+    with open(output, 'w') as module:
+        module.write("# Made from battle_data.json by python -m lowly_mage.logic, edit that and run it again instead\n\n")
+        module.write("SOURCE_CRC = %d\n\n" % zlib.crc32(raw))
+        module.write("DATA = " + pprint.pformat(json.loads(raw), width=110, sort_dicts=False) + "\n")
+
+def load_definitions(path=DATA_PATH):
+    data = read_data(path)
+    behaviors = list(data['behaviors'])
+    moves = [Move(i, move['name'], move['damage'], move['cost'], move['kind'], move.get('icon'), move.get('effect')) for i, move in enumerate(data['moves'])]
+    potions = [PotionType(i, potion['name'], potion['amount'], potion['kind'], potion.get('icon')) for i, potion in enumerate(data['potions'])]
+    enemy_types = [EnemyType(i, enemy['name'], enemy['health'], enemy['damage'], tuple(behaviors.index(b) for b in enemy['behaviors']), enemy.get('image'), enemy.get('attack_image'), enemy.get('effect'))
+                   for i, enemy in enumerate(data['enemies'])]
+    # Damage multiplier for [enemy type id][move id], anything the file leaves out is 1. Whole numbers are
+    # kept as ints so health that starts out whole stays whole.
+    effectiveness = tuple(tuple(whole(data.get('effectiveness', {}).get(enemy.name, {}).get(move.name, 1)) for move in moves) for enemy in enemy_types)
+    return behaviors, moves, potions, enemy_types, effectiveness, data['enemies_per_run']
+
+BEHAVIORS, MOVES, POTION_TYPES, ENEMY_ARCHETYPES, EFFECTIVENESS, ENEMIES_PER_RUN = load_definitions()
+
+# The same moves, potions and enemy types as plain tuples, (name, damage, mana cost, type), (name, amount,
+# type) and (name, health, damage, possible behaviors), in the order create_enemies() rolls them
+ATTACKS = [(move.name, move.damage, move.cost, move.kind) for move in MOVES]
+POTIONS = [(potion.name, potion.amount, potion.kind) for potion in POTION_TYPES]
+ENEMY_TYPES = [(enemy.name, enemy.health, enemy.damage, tuple(BEHAVIORS[b] for b in enemy.behaviors)) for enemy in ENEMY_ARCHETYPES]
+
+'''Every number above that can be tuned has a name in a parameter set: 'Goblin.health', 'Goblin.damage',
+'Fireball.damage', 'Fireball.cost', 'Health Potion.amount' and so on. default_params() gives the game's
+own values and tables() turns a parameter set back into the ATTACKS, POTIONS and ENEMY_TYPES lists, so
+tools like sim.py and tune.py can try other numbers without the game's tables changing.'''
+
+def default_params():
+    params = {}
+    for name, damage, cost, _ in ATTACKS:
+        params[name + '.damage'] = damage
+        params[name + '.cost'] = cost
+    for name, amount, _ in POTIONS:
+        params[name + '.amount'] = amount
+    for name, health, damage, _ in ENEMY_TYPES:
+        params[name + '.health'] = health
+        params[name + '.damage'] = damage
+    return params
+
+# (attacks, potions, enemy types) with the given parameters, anything left out keeps the game's value
+def tables(params=None):
+    values = default_params()
+    for name in params or {}:
+        if name not in values:
+            raise KeyError("Unknown parameter " + name)
+    values.update(params or {})
+    attacks = [(name, values[name + '.damage'], values[name + '.cost'], attack_type) for name, _, _, attack_type in ATTACKS]
+    potions = [(name, values[name + '.amount'], p_type) for name, _, p_type in POTIONS]
+    enemy_types = [(name, values[name + '.health'], values[name + '.damage'], behaviors) for name, _, _, behaviors in ENEMY_TYPES]
+    return attacks, potions, enemy_types
+
+# Inventory and abilities
+class Player:
+    __slots__ = ('health', 'mana', 'max_health', 'max_mana', 'gold', 'health_potions', 'mana_potions', 'has_fireball', 'last_attack_type')
+
+    def __init__(self):
+        self.health = 100
+        self.mana = 50
+        self.max_health = 100
+        self.max_mana = 50
+        self.gold = 0
+        self.health_potions = 3
+        self.mana_potions = 2
+        self.has_fireball = True
+        self.last_attack_type = None  # Track last attack for enemy AI
+
+'''The behaviors, one function each, picked from BEHAVIOR_TABLE by the enemy's behavior id. Each one
+gets the enemy (whose turns_since_last_attack has already gone up), the player and the random number
+source, and returns how much damage the enemy does this turn.'''
+
+def aggressive(enemy, player, rng):
+    # Always attack, but stronger when player is weak
+    if player.health < player.max_health * 0.3:
+        return enemy.archetype.damage * 1.5  # Critical hit when player is low
+    return enemy.archetype.damage
+
+def defensive(enemy, player, rng):
+    # Sometimes defend (heal) if health is low
+    max_health = enemy.archetype.health
+    if enemy.health < max_health * 0.4 and rng.random() < 0.5:
+        enemy.health = min(max_health, enemy.health + max_health * 0.3)
+        return 0  # No damage this turn
+    return enemy.archetype.damage
+
+def tactical(enemy, player, rng):
+    # React to player's last move and state
+    if player.last_attack_type == 'Fireball' and player.mana < 20:
+        # Player used fireball and is low on mana - press advantage
+        return enemy.archetype.damage * 1.2
+    elif player.health < player.max_health * 0.5:
+        # Player is below half health - finish them
+        return enemy.archetype.damage * 1.3
+    elif enemy.turns_since_last_attack > 2:
+        # Been too defensive - time to strike
+        return enemy.archetype.damage * 1.5
+    else:
+        # Default defensive stance
+        return enemy.archetype.damage * 0.8
+
+def reckless(enemy, player, rng):
+    # Random powerful attacks but sometimes misses
+    if rng.random() < 0.3:
+        return 0  # Miss
+    elif rng.random() < 0.2:
+        return enemy.archetype.damage * 2  # Big hit
+    return enemy.archetype.damage
+
+BEHAVIOR_TABLE = [{'aggressive': aggressive, 'defensive': defensive, 'tactical': tactical, 'reckless': reckless}[name] for name in BEHAVIORS]
+
+# Enhanced Enemy classes with behaviors. Everything that's the same for every enemy of a type stays on
+# the type, so an enemy is just four slots
+class Enemy:
+    __slots__ = ('archetype', 'behavior_id', 'health', 'turns_since_last_attack')
+
+    def __init__(self, archetype, behavior_id):
+        self.archetype = archetype
+        self.behavior_id = behavior_id
+        self.health = archetype.health
+        self.turns_since_last_attack = 0
+
+    @property
+    def name(self):
+        return self.archetype.name
+
+    @property
+    def max_health(self):
+        return self.archetype.health
+
+    @property
+    def damage(self):
+        return self.archetype.damage
+
+    @property
+    def image(self):
+        return self.archetype.image
+
+    @property
+    def attack_image(self):
+        return self.archetype.attack_image
+
+    @property
+    def effect(self):
+        return self.archetype.effect
+
+    @property
+    def type_id(self):
+        return self.archetype.id
+
+    @property
+    def behavior_type(self):
+        return BEHAVIORS[self.behavior_id]  # 'aggressive', 'defensive', 'tactical', 'reckless'
+
+    def decide_attack(self, player, rng=random):
+        # Decide attack strategy based on player state and enemy behavior
+        self.turns_since_last_attack += 1
+        return BEHAVIOR_TABLE[self.behavior_id](self, player, rng)
+
+'''Rolls the enemies for one run. rng can be any object with the same randint/choice/random methods as
+the random module, which is what lets simulations be seeded.'''
+
+def create_enemies(rng=random):
+    enemies = []
+    for _ in range(ENEMIES_PER_RUN):
+        archetype = ENEMY_ARCHETYPES[rng.randint(1, len(ENEMY_ARCHETYPES)) - 1]
+        enemies.append(Enemy(archetype, rng.choice(archetype.behaviors)))
+    return enemies
+
+'''The enemy's half of a turn, once the player has attacked. Like the game always has, a beaten enemy is
+replaced by the next one but still gets its attack in first, unless it was the last one. Returns the
+index of the enemy being fought now and how much damage the player took.'''
+
+def enemy_turn(player, enemies, index, rng=random):
+    enemy = enemies[index]
+    if enemy.health <= 0:
+        index += 1
+        if index >= len(enemies):
+            return index, 0
+    damage = enemy.decide_attack(player, rng)
+    player.health -= damage
+    return index, damage
+
+# Uses a move on the enemy. Returns False if the player doesn't have enough mana to cast it.
+def use_attack(player, enemy, move):
+    if player.mana < move.cost:
+        return False
+    player.mana -= move.cost
+    enemy.health -= move.damage * EFFECTIVENESS[enemy.archetype.id][move.id] # The enemy's health will be subtracted by the damage corresponding to the ability used
+    player.last_attack_type = move.name  # Track last attack
+    return True
+
+# Drinks a potion. Returns False if the player has none of that potion left. Potions don't use up a turn.
+def use_potion(player, potion):
+    if potion.kind == 'health' and player.health_potions > 0:
+        player.health = min(player.max_health, player.health + potion.amount)
+        player.health_potions -= 1
+        return True
+    elif potion.kind == 'mana' and player.mana_potions > 0:
+        player.mana = min(player.max_mana, player.mana + potion.amount)
+        player.mana_potions -= 1
+        return True
+    return False
+
+if __name__ == '__main__':
+    write_data_module()
+    print("Wrote " + DATA_MODULE)
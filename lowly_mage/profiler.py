@@ -0,0 +1,157 @@
+import json
+import os
+import time
+import pygame
+
+'''Per-frame instrumentation. When it's switched on (F3 in game, or MAGE_PROFILE=1) every frame records
+how long each phase took (polling events, the screens handling them, updating animations, drawing,
+audio, pushing the frame to the display) along with counters like blits and font renders. The last frame is shown in an overlay in the
+corner of the screen, and with MAGE_PROFILE_LOG set every frame is also written to that file as CSV or,
+if the name ends in .jsonl, as one JSON object per line. When it's off, timing a phase costs one
+attribute check.'''
+
+PHASES = ('events', 'input', 'update', 'draw', 'audio', 'present')
+
+class NoPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NO_PHASE = NoPhase()
+
+class Phase:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+        return False
+
+class FrameProfiler:
+    def __init__(self, enabled=False, log_path=None, toggle_key=pygame.K_F3):
+        self.enabled = enabled
+        self.toggle_key = toggle_key
+        self.phases = dict.fromkeys(PHASES, 0.0)  # Seconds spent in each phase this frame
+        self.watched = {}  # Counter name: function returning its running total
+        self.totals = {}  # Running totals at the end of the last frame
+        self.last = None  # Everything recorded for the last finished frame
+        self.memory = None  # Function returning an estimate of bytes held by assets, refreshed now and then
+        self.memory_bytes = 0
+        self.frame = 0
+        self.font = None
+        self.overlay_rect = None
+        self.on_overlay = []  # Called with the overlay's rectangle whenever it gets drawn or cleared
+        self.log = None
+        self.log_jsonl = False
+        if log_path:
+            self.log_jsonl = log_path.endswith('.jsonl')
+            self.log = open(log_path, 'w')
+            if not self.log_jsonl:
+                self.log.write(','.join(('frame', 'frame_ms') + tuple(name + '_ms' for name in PHASES) + ('counts',)) + '\n')
+
+    def phase(self, name):
+        if not self.enabled:
+            return NO_PHASE
+        return Phase(self, name)
+
+    def add(self, name, seconds):
+        if self.enabled:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    # Counters are running totals kept elsewhere (like the text cache's misses), the profiler records how
+    # much each one went up during the frame
+    def watch(self, name, total):
+        self.watched[name] = total
+        self.totals[name] = total()
+
+    def handle_events(self, events):
+        for event in events:
+            if event.type == pygame.KEYDOWN and event.key == self.toggle_key:
+                self.enabled = not self.enabled
+                if self.enabled:
+                    # Counters kept going while the profiler was off, start counting from here
+                    for name, total in self.watched.items():
+                        self.totals[name] = total()
+                elif self.overlay_rect:
+                    for listener in self.on_overlay:
+                        listener(self.overlay_rect)
+                    self.overlay_rect = None
+
+    # Called by the frame scheduler once the frame has been shown, with how long the frame took to make
+    def end_frame(self, frame_ms):
+        if self.enabled:
+            counts = {}
+            for name, total in self.watched.items():
+                value = total()
+                counts[name] = value - self.totals[name]
+                self.totals[name] = value
+            if self.memory and self.frame % 30 == 0:
+                self.memory_bytes = self.memory()
+            self.last = {
+                'frame': self.frame,
+                'frame_ms': frame_ms,
+                'phases_ms': {name: seconds * 1000 for name, seconds in self.phases.items()},
+                'counts': counts,
+                'memory_mb': self.memory_bytes / 1048576
+            }
+            self.write(self.last)
+            for name in self.phases:
+                self.phases[name] = 0.0
+        self.frame += 1
+
+    def write(self, record):
+        if not self.log:
+            return
+        if self.log_jsonl:
+            self.log.write(json.dumps(record) + '\n')
+        else:
+            counts = ' '.join(name + '=' + str(value) for name, value in sorted(record['counts'].items()))
+            row = [str(record['frame']), '%.3f' % record['frame_ms']] + ['%.3f' % record['phases_ms'].get(name, 0.0) for name in PHASES]
+            self.log.write(','.join(row) + ',' + counts + '\n')
+
+    # Draws the overlay and returns its rectangle so it can be pushed to the display with the frame
+    def draw_overlay(self, surface):
+        if not self.enabled or not self.last:
+            return None
+        if self.font is None:
+            pygame.font.init()
+            self.font = pygame.font.SysFont(None, 16)
+        last = self.last
+        lines = ["frame %.2f ms  mem %.1f MB" % (last['frame_ms'], last['memory_mb'])]
+        lines.append("  ".join("%s %.2f" % (name, last['phases_ms'].get(name, 0.0)) for name in PHASES[:3]))
+        lines.append("  ".join("%s %.2f" % (name, last['phases_ms'].get(name, 0.0)) for name in PHASES[3:]))
+        lines.append("  ".join("%s %d" % (name, value) for name, value in sorted(last['counts'].items())))
+        line_height = self.font.get_linesize()
+        rect = pygame.Rect(0, surface.get_height() - line_height * len(lines) - 4, 230, line_height * len(lines) + 4)
+        surface.fill((0, 0, 0), rect)
+        for i, line in enumerate(lines):
+            surface.blit(self.font.render(line, True, (0, 255, 0)), (rect.x + 2, rect.y + 2 + i * line_height))
+        self.overlay_rect = rect
+        for listener in self.on_overlay:
+            listener(rect)
+        return rect
+
+    def close(self):
+        if self.log:
+            self.log.close()
+            self.log = None
+
+# Switched on with MAGE_PROFILE=1, logging with MAGE_PROFILE_LOG=path
+def from_environment():
+    return FrameProfiler(enabled=bool(os.environ.get('MAGE_PROFILE')), log_path=os.environ.get('MAGE_PROFILE_LOG'))
+
+# Rough bytes of pixel data held by the given surfaces, subsurfaces share their parent's pixels so they
+# don't count
+def surface_memory(surfaces):
+    total = 0
+    for surface in surfaces:
+        if isinstance(surface, pygame.Surface) and surface.get_parent() is None:
+            total += surface.get_pitch() * surface.get_height()
+    return total
@@ -0,0 +1,104 @@
+import pygame
+
+'''Dirty rectangle rendering. A screen is split into widgets (bars, text, sprites, menus), each with the
+rectangle it draws into and the state it was last drawn with. Every frame the game hands each widget its
+current state, and only widgets whose state changed are repainted: the pre-composited background is
+copied back over the widget's rectangle, the widget draws itself, and just those rectangles are passed
+to pygame.display.update() instead of flipping the whole screen.'''
+
+# Flattens the given layers into one surface in the display's pixel format, so the background costs one
+# blit instead of one per layer
+def composite(layers, size):
+    surface = pygame.Surface(size).convert()
+    for layer in layers:
+        surface.blit(layer, (0, 0))
+    return surface
+
+class Widget:
+    def __init__(self, rect, draw, opaque=False):
+        self.rect = pygame.Rect(rect)
+        self.draw = draw  # Called with the widget's state, draws it onto the screen
+        self.opaque = opaque  # Opaque widgets cover their whole rectangle, so the background isn't restored first
+        self.state = None
+        self.dirty = True
+
+    def set(self, state):
+        if state != self.state:
+            self.state = state
+            self.dirty = True
+
+class DirtyRenderer:
+    def __init__(self, surface, background):
+        self.surface = surface
+        self.background = background
+        self.widgets = {}
+        self.full_redraw = True
+        self.damaged = []  # Areas something else drew over, repainted on the next render()
+        self.blits = 0  # Running total of background blits, for the profiler
+
+    # Widgets are drawn in the order they are added, so later ones end up on top
+    def add(self, name, rect, draw, opaque=False):
+        widget = Widget(pygame.Rect(rect).clip(self.surface.get_rect()), draw, opaque)
+        self.widgets[name] = widget
+        return widget
+
+    def set(self, name, state):
+        self.widgets[name].set(state)
+
+    # Makes the next render() repaint everything, for when something else has drawn over the screen
+    def invalidate(self):
+        self.full_redraw = True
+
+    # Marks an area that something outside of the widgets (like an overlay) drew over
+    def damage(self, rect):
+        self.damaged.append(pygame.Rect(rect))
+
+    # Repaints the widgets that changed and returns the rectangles that need to be pushed to the display
+    def render(self):
+        widgets = list(self.widgets.values())
+        if self.full_redraw:
+            self.surface.blit(self.background, (0, 0))
+            self.blits += 1
+            for widget in widgets:
+                self.draw_widget(widget)
+            self.full_redraw = False
+            self.damaged = []
+            return [self.surface.get_rect()]
+
+        damaged = self.damaged
+        self.damaged = []
+        for rect in damaged:
+            self.surface.blit(self.background, rect, rect)
+            self.blits += 1
+        dirty = damaged + [widget.rect for widget in widgets if widget.dirty]
+        if not dirty:
+            return []
+        # Anything overlapping a changed widget gets painted over by its background, so it has to be drawn
+        # again, and that can spread to whatever overlaps it in turn
+        spreading = True
+        while spreading:
+            spreading = False
+            for widget in widgets:
+                if not widget.dirty and widget.rect.collidelist(dirty) != -1:
+                    widget.dirty = True
+                    dirty.append(widget.rect)
+                    spreading = True
+
+        rects = list(damaged)
+        for widget in widgets:
+            if widget.dirty:
+                if not widget.opaque:
+                    self.surface.blit(self.background, widget.rect, widget.rect)
+                    self.blits += 1
+                rects.append(widget.rect)
+        for widget in widgets:
+            if widget.dirty:
+                self.draw_widget(widget)
+        return rects
+
+    def draw_widget(self, widget):
+        # Clipping keeps a widget from drawing outside of the rectangle it gets repainted in
+        self.surface.set_clip(widget.rect)
+        widget.draw(widget.state)
+        self.surface.set_clip(None)
+        widget.dirty = False
@@ -0,0 +1,113 @@
+import pygame
+from .renderer import DirtyRenderer
+from .text_cache import TextCache
+from .logic import MOVES, POTION_TYPES
+
+'''Everything the game draws with: the window, the fonts, text, bars, the battle menu and the battle
+view. Nothing here runs when the module is imported. open_window() starts pygame's display and font
+modules, opens the window and sets up the battle view the first time a game needs them, and everything
+else in here draws onto the screen it opened.'''
+
+WIDTH, HEIGHT = 400, 400
+
+screen = None
+font = None
+small_font = None
+line_height = 0
+assets = None  # The game's asset loader, handed over by open_window()
+battle_view = None
+
+# Rendered text is cached, so drawing a label that was drawn before is just a blit
+text_cache = TextCache()
+
+# Sprites, icons and text all go through here so the profiler can count the blits
+blit_count = 0
+
+# Opens the window, or just returns it if it's already open
+def open_window(asset_loader):
+    global screen, font, small_font, line_height, assets, battle_view
+    if screen is not None:
+        return screen
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption('Struggle of a Lowly Mage')
+    font = pygame.font.SysFont(None, 24)
+    small_font = pygame.font.SysFont(None, 18)
+    line_height = font.get_linesize()
+    assets = asset_loader
+    battle_view = make_battle_view()
+    return screen
+
+def blit(image, pos):
+    global blit_count
+    screen.blit(image, pos)
+    blit_count += 1
+
+def draw_text(text, x, y, color=(255, 255, 255), font_obj=None):
+    if text:
+        blit(text_cache.render(text, color, font_obj or font), (x, y))
+
+# Draws a line like "Health: 85/100" out of separately cached pieces, so new numbers don't mean new renders
+def draw_stat(label, current, max_val, x, y, color=(255, 255, 255), font_obj=None):
+    text_cache.draw_parts(screen, (label, str(current), "/", str(max_val)), (x, y), color, font_obj or font)
+
+def draw_health_bar(x, y, current, max_val, width=100, height=10):
+    ratio = current / max_val
+    pygame.draw.rect(screen, (255, 0, 0), (x, y, width, height))
+    pygame.draw.rect(screen, (0, 255, 0), (x, y, width * ratio, height))
+
+def draw_mana_bar(x, y, current, max_val, width=100, height=10):
+    ratio = current / max_val
+    pygame.draw.rect(screen, (100, 100, 255), (x, y, width, height))
+    pygame.draw.rect(screen, (0, 0, 255), (x, y, width * ratio, height))
+
+def draw_battle_menu(state):
+    menu_type, selection, action_hints, health_potions, mana_potions = state
+
+    # The menu covers the top 100 pixels, the rest of the widget is room for the icons that hang below it
+    pygame.draw.rect(screen, (50, 50, 50), (0, 0, 400, 100))
+
+    if menu_type == 'attacks':
+        draw_text("Attacks (TAB to switch)", 10, 10)
+        for i, move in enumerate(MOVES):
+            color = (255, 255, 0) if i == selection else (255, 255, 255)
+            y_pos = 40 + i * 30
+            draw_text(move.name + " (Cost: " + str(move.cost) + " MP)", 40, y_pos, color)
+            blit(assets[move.icon], (10, y_pos))
+
+            # Tells the user which attack gives them the best chance of winning the run from here
+            if i == selection:
+                draw_text(action_hints[i], 200, y_pos, (255, 200, 0))
+    else:
+        draw_text("Potions (TAB to switch)", 10, 10)
+        for i, potion in enumerate(POTION_TYPES):
+            color = (255, 255, 0) if i == selection else (255, 255, 255)
+            y_pos = 40 + i * 30
+            count = str(health_potions) if potion.kind == 'health' else str(mana_potions) # Checks if the user is hovering over the mana potion or the health potion in the potions menu
+            text_cache.draw_parts(screen, (potion.name, " (", count, " left)"), (40, y_pos), color, font)
+            blit(assets[potion.icon], (10, y_pos))
+
+            # Tells the user that drinking the potion now would beat attacking straight away
+            if i == selection:
+                draw_text(action_hints[len(MOVES) + i], 200, y_pos, (0, 255, 255))
+
+'''The battle scene is drawn with the dirty rectangle renderer. The arena, trees and bushes are flattened
+into one background once, and every bar, stat line, sprite and the menu is a widget that only gets
+repainted when what it shows changes.'''
+
+def make_battle_view():
+    view = DirtyRenderer(screen, None) # The background is put together when the first battle starts
+    view.add('menu', (0, 0, 400, 135), draw_battle_menu)
+    view.add('wizard', (50, 200, 100, 100), lambda image: blit(assets[image], (50, 200)))
+    view.add('enemy', (250, 200, 200, 200), lambda image: blit(assets[image], (250, 200)))
+    # The bars fill their whole rectangle, so there's no background to put back under them
+    view.add('player_health_bar', (50, 180, 100, 10), lambda state: draw_health_bar(50, 180, *state), opaque=True)
+    view.add('player_mana_bar', (50, 195, 100, 10), lambda state: draw_mana_bar(50, 195, *state), opaque=True)
+    view.add('enemy_health_bar', (250, 180, 100, 10), lambda state: draw_health_bar(250, 180, *state), opaque=True)
+    view.add('player_mana', (50, 140, 150, line_height), lambda state: draw_stat("Mana: ", state[0], state[1], 50, 140))
+    view.add('player_health', (50, 160, 150, line_height), lambda state: draw_stat("Health: ", state[0], state[1], 50, 160))
+    view.add('enemy_behavior', (250, 120, 150, small_font.get_linesize()), lambda behavior: text_cache.draw_parts(screen, ("Behavior: ", behavior), (250, 120), (255, 255, 255), small_font))
+    view.add('enemy_health', (250, 140, 150, line_height), lambda state: draw_stat("Health: ", state[0], state[1], 250, 140))
+    view.add('enemy_name', (250, 160, 150, line_height), lambda name: draw_text(name, 250, 160))
+    return view
@@ -0,0 +1,210 @@
+import argparse
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+import pygame
+from .frame_clock import FrameScheduler
+
+'''Recording and replaying play sessions. With MAGE_RECORD set to a file name the game seeds the random
+module itself and writes the seed, followed by every frame's input, to that file. Each frame is stored
+as when it started, how much time the animations were advanced by, and the key presses and quits the
+screens were handed, so the battles, the enemy attacks and the timing of every animation come out the
+same when the file is played back:
+
+    python -m lowly_mage.replay session.mrec            (in a window, at the speed it was played)
+    python -m lowly_mage.replay sessions/*.mrec --fast  (headless, as fast as possible)
+    python -m lowly_mage.replay --check                 (records a scripted session and replays it)
+
+The file ends with the outcome of the session (the game state, the player's health, mana and potions,
+and how many enemies were beaten), and the replay fails if it doesn't end up in the same place. A file
+without an outcome (the game didn't get to close it) can't be checked, so it doesn't count as a pass.'''
+
+MAGIC = b'MREC'
+VERSION = 3  # Version 1 recordings were made before the game's logic ran in fixed steps, version 2 stored health and mana as ints
+HEADER = struct.Struct('<4sHQH')  # Magic, version, seed, frame rate cap
+FRAME = struct.Struct('<IdH')  # Milliseconds since the start, animation dt, number of events
+EVENT = struct.Struct('<BI')  # Index into RECORDED_EVENTS, key
+OUTCOME = struct.Struct('<i2d3i')  # State, health, mana (enemy hits leave fractions), potions, enemies beaten
+END_OF_FRAMES = 0xFFFF  # Event count that marks the outcome record
+
+# Only the events the screens act on are recorded, everything else is left out of the file
+RECORDED_EVENTS = (pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP)
+
+class Recorder:
+    def __init__(self, path, scheduler, seed=None):
+        if seed is None:
+            seed = int.from_bytes(os.urandom(4), 'little')
+        self.seed = seed
+        self.scheduler = scheduler
+        self.start = time.perf_counter()
+        self.frames = 0
+        random.seed(seed)
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, scheduler.target_fps))
+
+    # Frame scheduler listener, sees every frame's events before the screen does
+    def record(self, events):
+        recorded = [event for event in events if event.type in RECORDED_EVENTS]
+        timestamp = int((time.perf_counter() - self.start) * 1000)
+        parts = [FRAME.pack(timestamp, self.scheduler.dt, len(recorded))]
+        for event in recorded:
+            parts.append(EVENT.pack(RECORDED_EVENTS.index(event.type), getattr(event, 'key', 0)))
+        self.file.write(b''.join(parts))
+        self.frames += 1
+
+    def close(self, outcome):
+        self.file.write(FRAME.pack(0, 0.0, END_OF_FRAMES) + OUTCOME.pack(*outcome))
+        self.file.close()
+
+# Reads a recording into (seed, target_fps, frames, outcome), frames being (timestamp_ms, dt, events)
+def load(path):
+    with open(path, 'rb') as recording:
+        data = recording.read()
+    magic, version, seed, target_fps = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(path + " is not a version %d recording" % VERSION)
+    frames = []
+    outcome = None
+    offset = HEADER.size
+    while offset < len(data):
+        timestamp, dt, count = FRAME.unpack_from(data, offset)
+        offset += FRAME.size
+        if count == END_OF_FRAMES:
+            outcome = OUTCOME.unpack_from(data, offset)
+            break
+        events = []
+        for _ in range(count):
+            kind, key = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            events.append((RECORDED_EVENTS[kind], key))
+        frames.append((timestamp, dt, events))
+    return seed, target_fps, frames, outcome
+
+def make_event(kind, key):
+    if kind == pygame.QUIT:
+        return pygame.event.Event(pygame.QUIT)
+    return pygame.event.Event(kind, key=key, mod=0, unicode='', scancode=0)
+
+'''Hands the screens the recorded events frame by frame instead of reading the keyboard, with the
+recorded dt in place of the real one so animations finish on the same frames they did when the session
+was played. In real time it waits until each frame's recorded time; otherwise it never waits, and only
+every render_every'th frame is pushed to the display (never, if it's 0).'''
+
+class ReplayScheduler(FrameScheduler):
+    def __init__(self, game, frames, target_fps, realtime=True, render_every=1):
+        FrameScheduler.__init__(self, target_fps=target_fps if realtime else 0, history=1000000)
+        self.listeners = list(game.frames.listeners)
+        self.profiler = game.frames.profiler
+        self.recorded = frames
+        self.next_frame = 0
+        self.realtime = realtime
+        self.render_every = render_every
+        self.replay_start = time.perf_counter()
+
+    def done(self):
+        return self.next_frame >= len(self.recorded)
+
+    def events(self):
+        # Things the game sends itself (like the music ending) still come from the real queue
+        live = [event for event in pygame.event.get() if event.type not in RECORDED_EVENTS]
+        if self.done():
+            events = [pygame.event.Event(pygame.QUIT)]  # Gets the game to quit
+        else:
+            timestamp, self.dt, recorded = self.recorded[self.next_frame]
+            self.next_frame += 1
+            if self.realtime:
+                delay = self.replay_start + timestamp / 1000 - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                    self.waited += delay
+            events = [make_event(kind, key) for kind, key in recorded] + live
+        for listener in self.listeners:
+            listener(events)
+        return events
+
+    def present(self, rects=None):
+        if not self.realtime and (not self.render_every or self.frames % self.render_every):
+            rects = []  # Drawn, but not pushed to the display
+        FrameScheduler.present(self, rects)
+
+# Plays one recording through a new game and returns (outcome, expected outcome, scheduler)
+def replay(game, path, realtime=True, render_every=1):
+    seed, target_fps, frames, expected = load(path)
+    scheduler = ReplayScheduler(game, frames, target_fps, realtime, render_every)
+    random.seed(seed)
+    stack = game.new_game(scheduler)
+    while not scheduler.done() and stack.frame():
+        pass
+    return game.session_outcome(stack), expected, scheduler
+
+'''Makes sure a recording plays back the way it was played: a scripted session (Play, then a Staff Whack
+every second, with the game over screen sending it back to the title and round again) is recorded through
+a Recorder to a temporary file and replayed. Returns (outcome, expected outcome).'''
+
+CHECK_FRAMES = 3000
+
+def round_trip(game, seed=1):
+    script = [(i * 1000 // 60, 1000 / 60, [(pygame.KEYDOWN, pygame.K_RETURN)] if i % 60 == 0 else []) for i in range(CHECK_FRAMES)]
+    handle, path = tempfile.mkstemp(suffix='.mrec')
+    os.close(handle)
+    try:
+        scheduler = ReplayScheduler(game, script, 0, realtime=False, render_every=0)
+        recorder = Recorder(path, scheduler, seed)
+        scheduler.listeners.append(recorder.record)
+        stack = game.new_game(scheduler)
+        while not scheduler.done() and stack.frame():
+            pass
+        recorder.close(game.session_outcome(stack))
+        outcome, expected, _ = replay(game, path, realtime=False, render_every=0)
+    finally:
+        os.remove(path)
+    return outcome, expected
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded play sessions.')
+    parser.add_argument('recordings', nargs='*')
+    parser.add_argument('--check', action='store_true', help='record a scripted session and check it replays the same')
+    parser.add_argument('--fast', action='store_true', help='headless and as fast as possible')
+    parser.add_argument('--render-every', type=int, default=0, help='with --fast, push every Nth frame to the display')
+    parser.add_argument('--stats', action='store_true', help='print frame times for every recording')
+    args = parser.parse_args()
+    if not args.recordings and not args.check:
+        parser.error("give some recordings to replay, or --check")
+
+    if args.fast:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    from . import game
+
+    failed = 0
+    unverified = 0
+    start = time.perf_counter()
+    if args.check:
+        outcome, expected = round_trip(game)
+        if tuple(outcome) != tuple(expected):
+            failed += 1
+            print("MISMATCH round trip: recorded %s, replayed %s" % (expected, outcome))
+        else:
+            print("OK round trip %s" % (outcome,))
+    for path in args.recordings:
+        outcome, expected, scheduler = replay(game, path, realtime=not args.fast, render_every=args.render_every)
+        if expected is None:
+            unverified += 1
+            print("UNVERIFIED %s: the recording has no outcome to check against (%d frames)" % (path, scheduler.frames))
+        elif tuple(outcome) != tuple(expected):
+            failed += 1
+            print("MISMATCH %s: expected %s, got %s" % (path, expected, outcome))
+        else:
+            print("OK %s (%d frames)" % (path, scheduler.frames))
+        if args.stats:
+            scheduler.report()
+    print("%d recordings, %d mismatched, %d unverified, %.2f s" % (len(args.recordings), failed, unverified, time.perf_counter() - start))
+    game.profiler.close()
+    pygame.quit()
+    return 1 if failed or unverified else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import os
+import pygame
+from .profiler import NO_PHASE
+
+'''Scenes and the loop that runs them. Every screen of the game is a Scene with three jobs kept apart:
+handle_event() reacts to input, update(dt) moves the game along by a fixed step of logic time, and
+render(alpha) draws what the scene looks like right now. Scenes sit on a stack, so a screen can be put
+on top of another one and popped off again to get back to it.
+
+There is one loop for every scene. Each frame it hands the events to the scene on top, runs as many
+fixed logic steps as the time since the last frame covers (so the game plays the same whether frames
+come at 30 or 144 a second), then renders with alpha saying how far the leftover time is into the next
+step, for anything that wants to be drawn in between two steps.'''
+
+# Logic steps per second, can be changed with the MAGE_LOGIC_HZ environment variable
+LOGIC_HZ = int(os.environ.get('MAGE_LOGIC_HZ', 100))
+MAX_FRAME_MS = 250  # A frame that took longer than this (a stall, a breakpoint) isn't caught up on
+
+class Scene:
+    state = None  # Which screen this is, for anything that needs to tell scenes apart
+
+    # Called when the scene ends up on top of the stack, after being pushed or when the one above is popped
+    def enter(self):
+        pass
+
+    def handle_event(self, event):
+        pass
+
+    def update(self, dt):
+        pass
+
+    # Whether something is moving, which keeps the frames coming even without input
+    def busy(self):
+        return False
+
+    # Draws the scene and returns the rectangles that changed, or None if the whole screen did
+    def render(self, alpha):
+        return None
+
+class SceneStack:
+    def __init__(self, frames, profiler=None, logic_hz=LOGIC_HZ):
+        self.frames = frames
+        self.profiler = profiler
+        self.step = 1000.0 / logic_hz  # Milliseconds of logic per update()
+        self.accumulator = 0.0
+        self.scenes = []
+        self.running = True
+        self.steps = 0
+
+    def top(self):
+        return self.scenes[-1] if self.scenes else None
+
+    def push(self, scene):
+        self.scenes.append(scene)
+        scene.stack = self
+        scene.enter()
+
+    def pop(self):
+        scene = self.scenes.pop()
+        if self.scenes:
+            self.scenes[-1].enter()
+        return scene
+
+    # Swaps the scene on top for another one, like going from a battle to the victory screen
+    def replace(self, scene):
+        self.scenes.pop()
+        self.push(scene)
+
+    def phase(self, name):
+        return self.profiler.phase(name) if self.profiler else NO_PHASE
+
+    def quit(self):
+        self.running = False
+
+    # Runs one frame, returns False once the game should stop
+    def frame(self):
+        events = self.frames.events()
+        with self.phase('input'):  # Key presses can start whole turns, so handling them is timed too
+            for event in events:
+                if event.type == pygame.QUIT:
+                    self.quit()
+                else:
+                    self.top().handle_event(event)
+                if not self.running:
+                    return False
+
+        self.accumulator += min(self.frames.dt, MAX_FRAME_MS)
+        while self.accumulator >= self.step:
+            with self.phase('update'):
+                self.top().update(self.step)
+            self.accumulator -= self.step
+            self.steps += 1
+
+        scene = self.top()
+        if scene.busy():
+            self.frames.invalidate()  # Keep the frames coming until it's done
+        with self.phase('draw'):
+            rects = scene.render(self.accumulator / self.step)
+        self.frames.present(rects)
+        return self.running
+
+    def run(self):
+        while self.frame():
+            pass
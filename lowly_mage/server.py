@@ -0,0 +1,203 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import time
+from .logic import Player, MOVES, POTION_TYPES, create_enemies, use_attack, use_potion, enemy_turn
+
+'''Battle server. Runs the battles from logic.py for many players at once from one process, with no
+window and no pygame. Every session has its own Player, its own enemies from create_enemies() and its own
+random.Random, so sessions never share dice and a session started with a seed always plays out the same.
+
+Clients connect over TCP (or a Unix socket with --unix) and talk in JSON, one object per line. Every
+request gets exactly one reply, in the order the requests were sent, so one connection can carry any
+number of sessions:
+
+    {"op": "new"}                               -> {"ok": true, "session": 1, "state": {...}}
+    {"op": "new", "seed": 42}                   -> the same enemies and enemy dice every time
+    {"op": "attack", "session": 1, "move": 1}   -> {"ok": true, "enemy_damage": 25, "state": {...}}
+    {"op": "potion", "session": 1, "potion": 0} -> {"ok": true, "state": {...}}
+    {"op": "state", "session": 1}               -> {"ok": true, "state": {...}}
+    {"op": "close", "session": 1}               -> {"ok": true}
+
+Moves and potions are their ids, the order they're in battle_data.json. A turn goes the way it does in
+the game: the attack, then the enemy's reply (potions don't use a turn). Once "result" in the state is
+"won" or "lost" the session is over and only "state" and "close" still work. Anything that goes wrong
+gets {"ok": false, "error": "..."} back and the connection stays open. Sessions are dropped when the
+connection that made them closes.
+
+    python -m lowly_mage.server --port 8765
+    python -m lowly_mage.load_client --port 8765 --sessions 1000'''
+
+class BattleSession:
+    def __init__(self, session_id, seed=None):
+        self.id = session_id
+        self.seed = seed if seed is not None else int.from_bytes(os.urandom(4), 'little')
+        self.rng = random.Random(self.seed)
+        self.player = Player()
+        self.enemies = create_enemies(self.rng)
+        self.current_enemy_index = 0
+        self.turns = 0
+
+    def result(self):
+        if self.player.health <= 0:
+            return 'lost'
+        if self.current_enemy_index >= len(self.enemies):
+            return 'won'
+        return None
+
+    def state(self):
+        player = self.player
+        state = {'session': self.id, 'seed': self.seed, 'turns': self.turns, 'result': self.result(),
+                 'health': player.health, 'mana': player.mana,
+                 'health_potions': player.health_potions, 'mana_potions': player.mana_potions,
+                 'enemy_index': self.current_enemy_index, 'enemies': len(self.enemies), 'enemy': None}
+        if self.current_enemy_index < len(self.enemies):
+            enemy = self.enemies[self.current_enemy_index]
+            state['enemy'] = {'name': enemy.name, 'health': enemy.health, 'max_health': enemy.max_health, 'behavior': enemy.behavior_type}
+        return state
+
+    # One turn: the move, then the enemy's reply. Returns how much damage the enemy did.
+    def attack(self, move):
+        if not use_attack(self.player, self.enemies[self.current_enemy_index], move):
+            raise ValueError("Not enough mana for " + move.name)
+        self.current_enemy_index, enemy_damage = enemy_turn(self.player, self.enemies, self.current_enemy_index, self.rng)
+        self.turns += 1
+        return enemy_damage
+
+    def potion(self, potion):
+        if not use_potion(self.player, potion):
+            raise ValueError("No " + potion.name + "s left")
+
+# Looks up a move or potion id from a request
+def pick(message, field, choices):
+    index = message.get(field)
+    if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < len(choices):
+        raise ValueError("%s must be an id from 0 to %d" % (field, len(choices) - 1))
+    return choices[index]
+
+class BattleServer:
+    def __init__(self):
+        self.sessions = {}
+        self.ids = itertools.count(1)
+        self.connections = 0
+        self.started = 0
+        self.finished = 0
+        self.turns = 0
+        self.turn_time = 0.0  # Seconds spent working out turns, to compare with what clients see
+        self.start = time.perf_counter()
+
+    # Handles one request and returns the reply. owned is the set of session ids the connection made.
+    def handle(self, message, owned):
+        op = message.get('op')
+        if op == 'new':
+            seed = message.get('seed')
+            if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+                raise ValueError("seed must be an integer")
+            session = BattleSession(next(self.ids), seed)
+            self.sessions[session.id] = session
+            owned.add(session.id)
+            self.started += 1
+            return {'ok': True, 'session': session.id, 'state': session.state()}
+
+        session_id = message.get('session')
+        if not isinstance(session_id, int) or isinstance(session_id, bool) or session_id not in owned:
+            raise ValueError("Unknown session %r" % (session_id,))
+        session = self.sessions[session_id]
+        if op == 'state':
+            return {'ok': True, 'state': session.state()}
+        if op == 'close':
+            owned.discard(session_id)
+            del self.sessions[session_id]
+            return {'ok': True}
+        if op not in ('attack', 'potion'):
+            raise ValueError("Unknown op %r" % (op,))
+        if session.result():
+            raise ValueError("The battle is over")
+
+        reply = {'ok': True}
+        if op == 'attack':
+            move = pick(message, 'move', MOVES)
+            start = time.perf_counter()
+            reply['enemy_damage'] = session.attack(move)
+            self.turn_time += time.perf_counter() - start
+            self.turns += 1
+            if session.result():
+                self.finished += 1
+        else:
+            session.potion(pick(message, 'potion', POTION_TYPES))
+        reply['state'] = session.state()
+        return reply
+
+    async def serve_client(self, reader, writer):
+        self.connections += 1
+        owned = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    break  # A line longer than the reader's limit
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message, dict):
+                        raise ValueError("Expected a JSON object")
+                    reply = self.handle(message, owned)
+                except ValueError as error:  # Bad JSON is a ValueError too
+                    reply = {'ok': False, 'error': str(error)}
+                except RecursionError:  # JSON nested too deep to parse
+                    reply = {'ok': False, 'error': "Request nested too deeply"}
+                writer.write(json.dumps(reply).encode() + b'\n')
+                # Only wait on the socket when the client isn't reading, so requests that come in together
+                # get answered together
+                if writer.transport.get_write_buffer_size() > 65536:
+                    await writer.drain()
+        except ConnectionError:
+            pass  # The client went away while we were writing
+        finally:
+            for session_id in owned:
+                del self.sessions[session_id]
+            self.connections -= 1
+            writer.close()
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start
+        print("%d connections, %d sessions open, %d started, %d finished, %d turns (%.0f/s, %.1f us each)" % (
+            self.connections, len(self.sessions), self.started, self.finished, self.turns,
+            self.turns / elapsed if elapsed else 0.0, self.turn_time / self.turns * 1e6 if self.turns else 0.0))
+
+async def serve(host, port, unix=None, report_every=10.0):
+    server = BattleServer()
+    if unix:
+        if os.path.exists(unix):
+            os.unlink(unix)  # Left behind by a server that didn't get to clean up
+        listener = await asyncio.start_unix_server(server.serve_client, path=unix, backlog=4096)
+        print("Listening on " + unix)
+    else:
+        listener = await asyncio.start_server(server.serve_client, host, port, backlog=4096)
+        print("Listening on %s:%d" % (host, port))
+    async with listener:
+        while True:
+            await asyncio.sleep(report_every)
+            server.report()
+
+def main():
+    parser = argparse.ArgumentParser(description='Host battles for many players over line-delimited JSON.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='listen on this Unix socket instead of TCP')
+    parser.add_argument('--report-every', type=float, default=10.0, help='seconds between stats lines')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.report_every))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+import argparse
+import numpy as np
+from .logic import Player, MOVES, ENEMY_TYPES, BEHAVIORS, ENEMIES_PER_RUN, EFFECTIVENESS, tables
+
+'''Headless battle simulator. Every row of the arrays below is one whole run (the player against the
+ENEMIES_PER_RUN enemies from create_enemies()), and each pass of the turn loop plays one turn of every run
+that is still going at the same time. The rules are the ones in logic.py, just written as array
+operations, so a million runs take seconds instead of hours.
+
+A few quirks of the game are kept on purpose so the numbers match what players actually see:
+potions don't use up a turn, the player keeps their health, mana and potions from one enemy to the next,
+and an enemy that was just defeated still gets its attack in unless it was the last one.'''
+
+AGGRESSIVE, DEFENSIVE, TACTICAL, RECKLESS = [BEHAVIORS.index(b) for b in ('aggressive', 'defensive', 'tactical', 'reckless')]
+
+# Per enemy type lookup, indexed by the type number create_enemies() rolls (minus one). Types can have any
+# number of behaviors, so the rows are padded with -1 and ENEMY_BEHAVIOR_COUNTS says how many are real
+ENEMY_BEHAVIOR_COUNTS = np.array([len(behaviors) for _, _, _, behaviors in ENEMY_TYPES], dtype=np.int64)
+ENEMY_BEHAVIORS = np.full((len(ENEMY_TYPES), ENEMY_BEHAVIOR_COUNTS.max()), -1, dtype=np.int64)
+for type_id, (_, _, _, behaviors) in enumerate(ENEMY_TYPES):
+    ENEMY_BEHAVIORS[type_id, :len(behaviors)] = [BEHAVIORS.index(b) for b in behaviors]
+ENEMY_EFFECTIVENESS = np.array(EFFECTIVENESS, dtype=np.float64)  # [enemy type, attack] damage multipliers
+
+# The tactical behavior goes after players who just cast the move called Fireball (see logic.py), -1 if there isn't one
+FIREBALL = next((move.id for move in MOVES if move.name == 'Fireball'), -1)
+
+'''The default way the simulated player plays, which follows the hints the game gives: drink a health
+potion below 30% health, drink a mana potion when there isn't enough mana for the strongest attack, and
+cast the strongest attack whenever possible (the cheapest one otherwise). A policy gets the run state and
+returns (drink health, drink mana, attack) arrays, one entry per run. The attack and potion numbers in use
+are in the state too, since they can be tuned.'''
+
+def hint_policy(state):
+    strongest = int(np.argmax(state['attack_damage']))
+    strongest_cost = state['attack_cost'][strongest]
+    drink_health = (state['health'] < state['max_health'] * 0.3) & (state['health_potions'] > 0)
+    drink_mana = (state['mana'] < strongest_cost) & (state['mana_potions'] > 0)
+    mana_after = np.where(drink_mana, np.minimum(state['max_mana'], state['mana'] + state['mana_amount']), state['mana'])
+    attack = np.where(mana_after >= strongest_cost, strongest, state['free_attack'])
+    return drink_health, drink_mana, attack
+
+class SimResult:
+    def __init__(self, won, lost, turns, damage_taken, damage_dealt, enemies_defeated):
+        self.won = won
+        self.lost = lost
+        self.turns = turns
+        self.damage_taken = damage_taken
+        self.damage_dealt = damage_dealt
+        self.enemies_defeated = enemies_defeated
+
+    @property
+    def battles(self):
+        return len(self.won)
+
+    @property
+    def win_rate(self):
+        return float(self.won.mean()) if self.battles else 0.0
+
+    # How many runs lasted each number of turns, index n is the count of runs that took n turns
+    def turn_distribution(self):
+        return np.bincount(self.turns)
+
+    # Histogram of the damage the player took over each run, as (counts, bin edges)
+    def damage_histogram(self, bins=20, dealt=False):
+        return np.histogram(self.damage_dealt if dealt else self.damage_taken, bins=bins)
+
+    def summary(self):
+        turns = self.turns
+        return {
+            'battles': self.battles,
+            'win_rate': self.win_rate,
+            'loss_rate': float(self.lost.mean()) if self.battles else 0.0,
+            'unfinished': int((~self.won & ~self.lost).sum()),
+            'turns_mean': float(turns.mean()) if self.battles else 0.0,
+            'turns_p50': float(np.percentile(turns, 50)) if self.battles else 0.0,
+            'turns_p95': float(np.percentile(turns, 95)) if self.battles else 0.0,
+            'damage_taken_mean': float(self.damage_taken.mean()) if self.battles else 0.0,
+            'damage_dealt_mean': float(self.damage_dealt.mean()) if self.battles else 0.0,
+            'enemies_defeated_mean': float(self.enemies_defeated.mean()) if self.battles else 0.0
+        }
+
+'''Runs n seeded battles and returns a SimResult. Runs that haven't finished after max_turns player
+attacks are stopped and counted as neither won nor lost. params is a parameter set (see logic.py)
+for trying other attack, potion and enemy numbers than the game's.'''
+
+def simulate(n, seed=None, policy=hint_policy, max_turns=500, params=None):
+    rng = np.random.default_rng(seed)
+    rows = np.arange(n)
+    base = Player()
+    attacks, potions, enemy_types = tables(params)
+    enemy_max_health = np.array([health for _, health, _, _ in enemy_types], dtype=np.float64)
+    enemy_damage = np.array([damage for _, _, damage, _ in enemy_types], dtype=np.float64)
+
+    # Player state
+    health = np.full(n, float(base.health))
+    mana = np.full(n, float(base.mana))  # Floats like health, so tuned costs and potions can have fractions
+    health_potions = np.full(n, base.health_potions, dtype=np.int64)
+    mana_potions = np.full(n, base.mana_potions, dtype=np.int64)
+    last_fireball = np.zeros(n, dtype=bool)
+
+    # Enemy state, one column per enemy in the run
+    enemy_type = rng.integers(0, len(ENEMY_TYPES), size=(n, ENEMIES_PER_RUN))
+    enemy_behavior = ENEMY_BEHAVIORS[enemy_type, rng.integers(0, ENEMY_BEHAVIOR_COUNTS[enemy_type])]
+    enemy_health = enemy_max_health[enemy_type]
+    enemy_turns = np.zeros((n, ENEMIES_PER_RUN), dtype=np.int64)
+    current = np.zeros(n, dtype=np.int64)
+
+    won = np.zeros(n, dtype=bool)
+    lost = np.zeros(n, dtype=bool)
+    turns = np.zeros(n, dtype=np.int64)
+    damage_taken = np.zeros(n)
+    damage_dealt = np.zeros(n)
+
+    attack_damage = np.array([damage for _, damage, _, _ in attacks], dtype=np.float64)
+    attack_cost = np.array([cost for _, _, cost, _ in attacks], dtype=np.float64)
+    free_attack = int(np.argmin(attack_cost))  # What the player falls back on when they're out of mana
+    # Potions are found by kind, whatever order the file lists them in
+    health_amount = next((amount for _, amount, kind in potions if kind == 'health'), 0)
+    mana_amount = next((amount for _, amount, kind in potions if kind == 'mana'), 0)
+
+    for _ in range(max_turns):
+        # Only the runs that are still going are touched, so late turns get cheaper as runs finish
+        live = rows[~(won | lost)]
+        if len(live) == 0:
+            break
+        cur = current[live]
+        kind = enemy_type[live, cur]
+        behavior = enemy_behavior[live, cur]
+        max_enemy_health = enemy_max_health[kind]
+
+        # Potions first, they don't end the turn
+        state = {
+            'health': health[live], 'max_health': base.max_health,
+            'mana': mana[live], 'max_mana': base.max_mana,
+            'health_potions': health_potions[live], 'mana_potions': mana_potions[live],
+            'enemy_type': kind, 'enemy_behavior': behavior, 'enemy_health': enemy_health[live, cur],
+            'last_fireball': last_fireball[live],
+            'attack_damage': attack_damage, 'attack_cost': attack_cost, 'free_attack': free_attack, 'mana_amount': mana_amount
+        }
+        drink_health, drink_mana, attack = policy(state)
+        drink_health = drink_health & (health_potions[live] > 0)
+        drink_mana = drink_mana & (mana_potions[live] > 0)
+        health[live] = np.where(drink_health, np.minimum(base.max_health, health[live] + health_amount), health[live])
+        health_potions[live] -= drink_health
+        mana[live] = np.where(drink_mana, np.minimum(base.max_mana, mana[live] + mana_amount), mana[live])
+        mana_potions[live] -= drink_mana
+
+        # Player attack, falling back to the free attack if the chosen one costs too much mana
+        attack = np.where(mana[live] >= attack_cost[attack], attack, free_attack)
+        dealt = attack_damage[attack] * ENEMY_EFFECTIVENESS[kind, attack]
+        mana[live] -= attack_cost[attack]
+        last_fireball[live] = attack == FIREBALL
+        enemy_health[live, cur] -= dealt
+        damage_dealt[live] += dealt
+        turns[live] += 1
+
+        defeated = enemy_health[live, cur] <= 0
+        current[live] += defeated
+        finished = current[live] >= ENEMIES_PER_RUN
+        won[live[finished]] = True
+
+        # Enemy turn (Enemy.decide_attack) for everyone that hasn't just won
+        fighting = ~finished
+        live, cur, kind, behavior = live[fighting], cur[fighting], kind[fighting], behavior[fighting]
+        max_enemy_health = max_enemy_health[fighting]
+        enemy_turns[live, cur] += 1
+        player_health = health[live]
+        damage = enemy_damage[kind].copy()
+        roll_a = rng.random(len(live))
+        roll_b = rng.random(len(live))
+
+        low = player_health < base.max_health * 0.3
+        damage[(behavior == AGGRESSIVE) & low] *= 1.5
+
+        heals = (behavior == DEFENSIVE) & (enemy_health[live, cur] < max_enemy_health * 0.4) & (roll_a < 0.5)
+        enemy_health[live[heals], cur[heals]] = np.minimum(max_enemy_health[heals], enemy_health[live[heals], cur[heals]] + max_enemy_health[heals] * 0.3)
+        damage[heals] = 0
+
+        tactical = behavior == TACTICAL
+        press = tactical & last_fireball[live] & (mana[live] < 20)
+        finish = tactical & ~press & (player_health < base.max_health * 0.5)
+        strike = tactical & ~press & ~finish & (enemy_turns[live, cur] > 2)
+        stance = tactical & ~press & ~finish & ~strike
+        damage[press] *= 1.2
+        damage[finish] *= 1.3
+        damage[strike] *= 1.5
+        damage[stance] *= 0.8
+
+        reckless = behavior == RECKLESS
+        damage[reckless & (roll_a < 0.3)] = 0
+        damage[reckless & (roll_a >= 0.3) & (roll_b < 0.2)] *= 2
+
+        health[live] -= damage
+        damage_taken[live] += damage
+        lost[live[health[live] <= 0]] = True
+
+    return SimResult(won, lost, turns, damage_taken, damage_dealt, np.minimum(current, ENEMIES_PER_RUN))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run headless Struggle of a Lowly Mage battles.')
+    parser.add_argument('-n', '--battles', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--bins', type=int, default=10)
+    args = parser.parse_args()
+
+    result = simulate(args.battles, seed=args.seed)
+    for key, value in result.summary().items():
+        print(key + ":", value)
+    counts, edges = result.damage_histogram(args.bins)
+    print("Damage taken:")
+    for count, low, high in zip(counts, edges, edges[1:]):
+        print("  %6.1f - %6.1f: %d" % (low, high, count))
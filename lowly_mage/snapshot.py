@@ -0,0 +1,188 @@
+import argparse
+import os
+import random
+import struct
+import time
+from .logic import Player, Enemy, MOVES, POTION_TYPES, ENEMY_ARCHETYPES, BEHAVIORS, enemy_turn, use_attack, use_potion
+from .solver import SolverTable, make_state
+
+'''Save games. A snapshot is everything a run needs to carry on exactly where it was: the player (health,
+mana, gold, potions, last attack), the run's enemies, which of them is being fought, and the state of the
+random number generator, so the enemies roll the same attacks after loading as they would have without
+stopping. Nothing from pygame goes in. Enemies are saved as the ids of their type and behavior in
+battle_data.json, and their images come back from the type, so a snapshot never holds a Surface.
+
+The format is a fixed sequence of little-endian structs, in the same way as recordings (see replay.py):
+
+    header   magic, version, flags (bit 0: has generator state)
+    player   health, mana, max health, max mana, gold, potions, has Fireball, last attack, int/float bits
+    run      index of the enemy being fought, number of enemies
+    enemy    type id, behavior id, health is a float, health, turns since last attack   (one per enemy)
+    rng      the Mersenne Twister's 625 words, whether a gauss value is waiting, and the value
+
+which comes to about 2.6 KB and takes microseconds either way. Numbers that were ints come back as ints,
+so health that was 85 doesn't come back as 85.0.
+
+The game saves one at the start of every turn (see MAGE_SAVE in the README) and offers to continue from it
+on the title screen. The same snapshots are a cheap starting point for tools: fork() makes as many copies
+of a mid-fight state as you like, each with its own random number generator.
+
+    python -m lowly_mage.snapshot autosave.msav                       (show what's in it)
+    python -m lowly_mage.snapshot autosave.msav --fork 10000 --seed 1 (play it out 10000 times)'''
+
+MAGIC = b'MSAV'
+VERSION = 1
+HEADER = struct.Struct('<4sHB')  # Magic, version, flags
+PLAYER = struct.Struct('<4dqHHBBB')
+RUN = struct.Struct('<BB')
+ENEMY = struct.Struct('<BBBdI')
+RNG = struct.Struct('<625IBd')
+HAS_RNG = 1
+NO_ATTACK = 0  # Stored as last attack when there hasn't been one, moves are stored as their id + 1
+
+# Bit n of the mask is set if the nth number is a float
+def float_mask(*values):
+    mask = 0
+    for i, value in enumerate(values):
+        if isinstance(value, float):
+            mask |= 1 << i
+    return mask
+
+def number(value, mask, bit):
+    return value if mask & (1 << bit) else int(value)
+
+'''Packs a run into a snapshot. rng is what the enemies roll with, the random module in the game or a
+random.Random of its own anywhere else, or None to leave the generator out.'''
+
+def dumps(player, enemies, current_enemy_index, rng=random):
+    flags = HAS_RNG if rng is not None else 0
+    if player.last_attack_type is None:
+        last_attack = NO_ATTACK
+    else:
+        last_attack = [move.name for move in MOVES].index(player.last_attack_type) + 1
+    parts = [HEADER.pack(MAGIC, VERSION, flags),
+             PLAYER.pack(player.health, player.mana, player.max_health, player.max_mana, player.gold,
+                         player.health_potions, player.mana_potions, player.has_fireball, last_attack,
+                         float_mask(player.health, player.mana, player.max_health, player.max_mana)),
+             RUN.pack(current_enemy_index, len(enemies))]
+    for enemy in enemies:
+        parts.append(ENEMY.pack(enemy.archetype.id, enemy.behavior_id, isinstance(enemy.health, float), enemy.health, enemy.turns_since_last_attack))
+    if rng is not None:
+        version, words, gauss_next = rng.getstate()
+        parts.append(RNG.pack(*words, gauss_next is not None, gauss_next or 0.0))
+    return b''.join(parts)
+
+'''Unpacks a snapshot into (player, enemies, current_enemy_index). If the snapshot has the generator state
+in it, rng is set to it (pass None to leave rng alone). Raises ValueError if the data isn't a snapshot
+this version of the game can load.'''
+
+def loads(data, rng=random):
+    try:
+        magic, version, flags = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a version %d save" % VERSION)
+        offset = HEADER.size
+        health, mana, max_health, max_mana, gold, health_potions, mana_potions, has_fireball, last_attack, mask = PLAYER.unpack_from(data, offset)
+        offset += PLAYER.size
+        current_enemy_index, count = RUN.unpack_from(data, offset)
+        offset += RUN.size
+
+        player = Player()
+        player.health = number(health, mask, 0)
+        player.mana = number(mana, mask, 1)
+        player.max_health = number(max_health, mask, 2)
+        player.max_mana = number(max_mana, mask, 3)
+        player.gold = gold
+        player.health_potions = health_potions
+        player.mana_potions = mana_potions
+        player.has_fireball = bool(has_fireball)
+        player.last_attack_type = None if last_attack == NO_ATTACK else MOVES[last_attack - 1].name
+
+        enemies = []
+        for _ in range(count):
+            type_id, behavior_id, is_float, enemy_health, turns = ENEMY.unpack_from(data, offset)
+            offset += ENEMY.size
+            if behavior_id >= len(BEHAVIORS):
+                raise ValueError("Unknown behavior %d" % behavior_id)
+            enemy = Enemy(ENEMY_ARCHETYPES[type_id], behavior_id)
+            enemy.health = enemy_health if is_float else int(enemy_health)
+            enemy.turns_since_last_attack = turns
+            enemies.append(enemy)
+
+        if flags & HAS_RNG and rng is not None:
+            state = RNG.unpack_from(data, offset)
+            rng.setstate((3, state[:625], state[626] if state[625] else None))
+    except (struct.error, IndexError) as error:
+        raise ValueError("Damaged save: %s" % error)
+    return player, enemies, current_enemy_index
+
+# Written next to the old save and swapped in, so quitting halfway through a save never loses the last one
+def save(path, player, enemies, current_enemy_index, rng=random):
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as save_file:
+        save_file.write(dumps(player, enemies, current_enemy_index, rng))
+    os.replace(temporary, path)
+
+def load(path, rng=random):
+    with open(path, 'rb') as save_file:
+        return loads(save_file.read(), rng)
+
+'''Copies of one snapshot that can each be played on separately, as (player, enemies, current_enemy_index,
+rng). The copies get their own random.Random seeded from seed, so they split off from each other at the
+first roll; with same_rolls they all start from the generator state in the snapshot instead.'''
+
+def fork(data, count, seed=None, same_rolls=False):
+    seeds = random.Random(seed)
+    forks = []
+    for _ in range(count):
+        rng = random.Random(seeds.getrandbits(64))
+        player, enemies, current_enemy_index = loads(data, rng if same_rolls else None)
+        forks.append((player, enemies, current_enemy_index, rng))
+    return forks
+
+# Plays a fork to the end of the run, taking the action the solver rates best every turn. True if it was won.
+def play_out(player, enemies, current_enemy_index, rng, table):
+    while player.health > 0 and current_enemy_index < len(enemies):
+        action_values = table.action_values(make_state(player, enemies[current_enemy_index], current_enemy_index))
+        best = -max((value, -i) for i, value in enumerate(action_values) if value is not None)[1]  # First of any ties
+        if best < len(MOVES):
+            use_attack(player, enemies[current_enemy_index], MOVES[best])
+            current_enemy_index, _ = enemy_turn(player, enemies, current_enemy_index, rng)
+        else:
+            use_potion(player, POTION_TYPES[best - len(MOVES)])
+    return player.health > 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Show a save, or play it out many times from where it was saved.')
+    parser.add_argument('save')
+    parser.add_argument('--fork', type=int, default=0, help='play this many copies of the save to the end')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.save, 'rb') as save_file:
+        data = save_file.read()
+    start = time.perf_counter()
+    player, enemies, current_enemy_index = loads(data, None)
+    loaded = time.perf_counter() - start
+    start = time.perf_counter()
+    dumps(player, enemies, current_enemy_index)
+    dumped = time.perf_counter() - start
+    print("%s: %d bytes, loads in %.1f us, saves in %.1f us" % (args.save, len(data), loaded * 1e6, dumped * 1e6))
+    print("Player: health %s/%s, mana %s/%s, %d gold, %d health and %d mana potions, last attack %s" % (
+        player.health, player.max_health, player.mana, player.max_mana, player.gold,
+        player.health_potions, player.mana_potions, player.last_attack_type))
+    for i, enemy in enumerate(enemies):
+        marker = '>' if i == current_enemy_index else ' '
+        print("%s %d. %s (%s), health %s/%s" % (marker, i + 1, enemy.name, enemy.behavior_type, enemy.health, enemy.max_health))
+
+    if args.fork:
+        table = SolverTable()
+        start = time.perf_counter()
+        forks = fork(data, args.fork, args.seed)
+        forked = time.perf_counter() - start
+        won = sum(play_out(*copy, table=table) for copy in forks)
+        elapsed = time.perf_counter() - start
+        print("%d forks in %.1f ms, played out in %.2f s: %.2f%% won" % (args.fork, forked * 1000, elapsed, won * 100.0 / args.fork))
+
+if __name__ == '__main__':
+    main()
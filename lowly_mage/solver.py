@@ -0,0 +1,388 @@
+import argparse
+import hashlib
+import math
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from . import data_path
+from .logic import Player, ATTACKS, POTIONS, ENEMY_TYPES, BEHAVIORS, ENEMIES_PER_RUN, EFFECTIVENESS
+
+'''Works out how to play a run as well as possible, which is what the menu hints come from. A battle
+state is everything the rules look at: which enemy of the run it is, the enemy's type, behavior, health
+and turns_since_last_attack, and the player's health, mana, potions and whether their last attack was a
+Fireball. For every state the player can be in at the start of their turn the solver finds the chance of
+winning the whole run after each possible action, assuming the best play from then on and averaging over
+the enemy's rolls the same way Enemy.decide_attack() makes them.
+
+Defensive enemies can heal back up, so rather than trusting a plain recursion the values are found by
+sweeping over every reachable state until they stop changing. That takes a few seconds, so it's done once:
+
+    python -m lowly_mage.solver
+
+and the results are saved in solver.bin as a sorted array of packed state keys next to an array of
+action values, so a lookup in the game is a binary search. The table also keeps a hash of the rules it
+was solved for, and a table for different rules isn't used. States that aren't in the table (a run set
+up by hand, or no usable table at all) are solved when they come up and kept in a cache. The game has
+them solved on a background thread so a turn never waits on one.'''
+
+TABLE_PATH = data_path('solver.bin')
+MAGIC = b'MSLV'
+VERSION = 2
+HEADER = struct.Struct('<4sHI32s')  # Magic, version, number of states, SHA-256 of battle_data.json
+
+# Actions in the order their values are stored: every attack, then every potion
+ACTIONS = [attack[0] for attack in ATTACKS] + [potion[0] for potion in POTIONS]
+NOT_AVAILABLE = 0xFFFF  # Stored for actions that can't be used (no mana, no potions left)
+SCALE = 0xFFFE  # Chances are stored as 16 bit fractions
+
+# Mana only ever changes by move costs and mana potions, so it's stored in steps of the largest amount
+# all of them (and the player's mana to start with) are a multiple of. 25 for the game's own numbers.
+MANA_STEP = math.gcd(Player().max_mana, Player().mana, *[cost for _, _, cost, _ in ATTACKS],
+                     *[amount for _, amount, p_type in POTIONS if p_type == 'mana'])
+MAX_HEALTH = Player().max_health * 2  # In half points
+MAX_MANA = Player().max_mana // MANA_STEP
+
+# The rules the table was solved for: only what the battles depend on, so changing a sprite name (or how
+# battle_data.json is laid out) doesn't throw the table away
+def rules_hash():
+    player = Player()
+    rules = (ENEMIES_PER_RUN, BEHAVIORS, [(name, damage, cost) for name, damage, cost, _ in ATTACKS],
+             [(amount, p_type) for _, amount, p_type in POTIONS], [(health, damage, behaviors) for _, health, damage, behaviors in ENEMY_TYPES],
+             EFFECTIVENESS, [getattr(player, name) for name in Player.__slots__])
+    return hashlib.sha256(repr(rules).encode()).digest()
+
+# Every enemy create_enemies() can roll, with the chance of rolling it
+ENEMY_ROLLS = [(enemy_type, BEHAVIORS.index(behavior), 1.0 / len(ENEMY_TYPES) / len(behaviors))
+               for enemy_type, (_, _, _, behaviors) in enumerate(ENEMY_TYPES) for behavior in behaviors]
+
+AGGRESSIVE, DEFENSIVE, TACTICAL, RECKLESS = [BEHAVIORS.index(b) for b in ('aggressive', 'defensive', 'tactical', 'reckless')]
+
+'''States are tuples of small integers: (enemy index, enemy type, behavior, enemy health, turns since
+the enemy's last attack, player health in half points, mana in steps of MANA_STEP, last attack was a Fireball,
+health potions, mana potions). Player health is kept in half points because some enemy attacks do
+half-point damage (a Knight's 1.3x hit is 32.5). Turns only matter to tactical enemies and only up to
+2, so they're capped there and left at 0 for everyone else.'''
+
+def make_state(player, enemy, enemy_index):
+    behavior = enemy.behavior_id
+    turns = min(enemy.turns_since_last_attack, 2) if behavior == TACTICAL else 0
+    return (enemy_index, enemy.archetype.id, behavior, int(round(enemy.health)), turns, int(round(player.health * 2)),
+            int(player.mana) // MANA_STEP, int(player.last_attack_type == 'Fireball'), player.health_potions, player.mana_potions)
+
+# How many values each part of a state can take, and so how many bits it gets in a key
+LIMITS = (ENEMIES_PER_RUN, len(ENEMY_TYPES), len(BEHAVIORS), max(health for _, health, _, _ in ENEMY_TYPES) + 1, 3,
+          MAX_HEALTH + 1, MAX_MANA + 1, 2, 4, 4)
+BITS = [max(1, (limit - 1).bit_length()) for limit in LIMITS]
+KEY_TYPE = 'I' if sum(BITS) <= 32 else 'Q'  # 31 bits for the game's own numbers
+
+# Packs a state into the key it's stored under in the table
+def pack_state(state):
+    key = 0
+    for value, bits in zip(state, BITS):
+        key = (key << bits) | value
+    return key
+
+# Whether a state fits in a key at all (anything else can only be solved on the spot)
+def packable(state):
+    return all(0 <= value < limit for value, limit in zip(state, LIMITS))
+
+# The enemy's possible replies as (chance, damage in half points, enemy health after), like decide_attack()
+def enemy_replies(state, mana, fireball):
+    _, enemy_type, behavior, enemy_health, turns, health, _, _, _, _ = state
+    _, max_health, damage, _ = ENEMY_TYPES[enemy_type]
+    damage *= 2
+    if behavior == AGGRESSIVE:
+        return [(1.0, damage * 1.5 if health < MAX_HEALTH * 0.3 else damage, enemy_health)]
+    if behavior == DEFENSIVE:
+        if enemy_health < max_health * 0.4:
+            return [(0.5, 0, min(max_health, int(round(enemy_health + max_health * 0.3)))), (0.5, damage, enemy_health)]
+        return [(1.0, damage, enemy_health)]
+    if behavior == TACTICAL:
+        if fireball and mana * MANA_STEP < 20:
+            multiplier = 1.2
+        elif health < MAX_HEALTH * 0.5:
+            multiplier = 1.3
+        elif turns + 1 > 2:
+            multiplier = 1.5
+        else:
+            multiplier = 0.8
+        return [(1.0, damage * multiplier, enemy_health)]
+    return [(0.3, 0, enemy_health), (0.7 * 0.2, damage * 2, enemy_health), (0.7 * 0.8, damage, enemy_health)]
+
+'''What each action leads to, one entry per action in ACTIONS: None if it can't be used, otherwise a list
+of (chance, outcome) where the outcome is the next state or, once the run is over, 1.0 for a win and 0.0
+for a loss. Like the game, potions don't end the turn, and an enemy that was just beaten still attacks
+before the next one shows up.'''
+
+def outcomes(state):
+    enemy_index, enemy_type, behavior, enemy_health, turns, health, mana, fireball, health_potions, mana_potions = state
+    results = []
+    for move, (name, damage, cost, _) in enumerate(ATTACKS):
+        if mana * MANA_STEP < cost:
+            results.append(None)
+            continue
+        mana_after = mana - cost // MANA_STEP
+        fireball_after = int(name == 'Fireball')
+        hit = (enemy_index, enemy_type, behavior, int(round(enemy_health - damage * EFFECTIVENESS[enemy_type][move])), turns, health, mana_after, fireball_after, health_potions, mana_potions)
+        if hit[3] <= 0 and enemy_index + 1 == ENEMIES_PER_RUN:
+            results.append([(1.0, 1.0)])
+            continue
+        turns_after = min(turns + 1, 2) if behavior == TACTICAL else 0
+        result = []
+        for chance, enemy_damage, enemy_health_after in enemy_replies(hit, mana_after, fireball_after):
+            health_after = int(round(health - enemy_damage))
+            if health_after <= 0:
+                result.append((chance, 0.0))
+            elif hit[3] <= 0:
+                for next_type, next_behavior, roll in ENEMY_ROLLS:
+                    result.append((chance * roll, (enemy_index + 1, next_type, next_behavior, ENEMY_TYPES[next_type][1], 0, health_after, mana_after, fireball_after, health_potions, mana_potions)))
+            else:
+                result.append((chance, (enemy_index, enemy_type, behavior, enemy_health_after, turns_after, health_after, mana_after, fireball_after, health_potions, mana_potions)))
+        results.append(result)
+    for name, amount, p_type in POTIONS:
+        if p_type == 'health' and health_potions > 0:
+            results.append([(1.0, state[:5] + (min(MAX_HEALTH, health + amount * 2),) + state[6:8] + (health_potions - 1, mana_potions))])
+        elif p_type == 'mana' and mana_potions > 0:
+            results.append([(1.0, state[:6] + (min(MAX_MANA, mana + amount // MANA_STEP),) + state[7:9] + (mana_potions - 1,))])
+        else:
+            results.append(None)
+    return results
+
+# Every state a run can start in. Potions and the last attack carry over from one run to the next.
+def start_states():
+    return [(0, enemy_type, behavior, ENEMY_TYPES[enemy_type][1], 0, MAX_HEALTH, MAX_MANA, fireball, health_potions, mana_potions)
+            for enemy_type, behavior, _ in ENEMY_ROLLS for fireball in (0, 1) for health_potions in range(4) for mana_potions in range(3)]
+
+'''Finds every state reachable from the given ones and sweeps over them until no value changes by more
+than tolerance. The states are swept children first (the order a depth first search finishes them in),
+so unless something loops back around (a defensive enemy healing up) one sweep settles everything and
+the second just checks. known can return the value of a state that's already been worked out (or None),
+and the search stops there. Returns {state: action values}.'''
+
+def solve(starts, known=None, tolerance=1e-9, verbose=False):
+    index = {}
+    order = []
+    fixed = {}  # Index: value of the states known() already had a value for
+
+    def visit(state):
+        index[state] = None
+        value = known(state) if known else None
+        if value is None:
+            return True
+        index[state] = len(order)
+        fixed[len(order)] = value
+        order.append(state)
+        return False
+
+    for start in starts:
+        if start in index or not visit(start):
+            continue
+        stack = [(start, outcome_states(start))]
+        while stack:
+            state, children = stack[-1]
+            for child in children:
+                if child not in index and visit(child):
+                    stack.append((child, outcome_states(child)))
+                    break
+            else:
+                stack.pop()
+                index[state] = len(order)
+                order.append(state)
+
+    win, loss = len(order), len(order) + 1
+    edges = []
+    for i, state in enumerate(order):
+        if i in fixed:
+            edges.append(None)
+            continue
+        actions = []
+        for result in outcomes(state):
+            if result is None:
+                actions.append(None)
+            else:
+                actions.append([(chance, index[outcome] if isinstance(outcome, tuple) else (win if outcome else loss)) for chance, outcome in result])
+        edges.append(actions)
+    if verbose:
+        print("%d states" % len(order))
+
+    values = [fixed.get(i, 0.0) for i in range(len(order))] + [1.0, 0.0]
+    sweeps = 0
+    changed = tolerance + 1
+    while changed > tolerance:
+        changed = 0.0
+        for i, actions in enumerate(edges):
+            if actions is None:
+                continue
+            best = 0.0
+            for action in actions:
+                if action is not None:
+                    value = 0.0
+                    for chance, target in action:
+                        value += chance * values[target]
+                    if value > best:
+                        best = value
+            if abs(best - values[i]) > changed:
+                changed = abs(best - values[i])
+            values[i] = best
+        sweeps += 1
+        if verbose:
+            print("sweep %d: largest change %.2e" % (sweeps, changed))
+
+    solved = {}
+    for state, actions in zip(order, edges):
+        if actions is not None:
+            solved[state] = tuple(None if action is None else sum(chance * values[target] for chance, target in action) for action in actions)
+    return solved
+
+def outcome_states(state):
+    return iter([outcome for result in outcomes(state) if result for _, outcome in result if isinstance(outcome, tuple)])
+
+def save(solved, path=TABLE_PATH):
+    keys = array(KEY_TYPE, sorted(pack_state(state) for state in solved))
+    by_key = {pack_state(state): action_values for state, action_values in solved.items()}
+    values = array('H')
+    for key in keys:
+        values.extend(NOT_AVAILABLE if value is None else int(round(value * SCALE)) for value in by_key[key])
+    if sys.byteorder == 'big':
+        keys.byteswap()
+        values.byteswap()
+    with open(path, 'wb') as table:
+        table.write(HEADER.pack(MAGIC, VERSION, len(keys), rules_hash()))
+        table.write(keys.tobytes())
+        table.write(values.tobytes())
+
+class SolverTable:
+    def __init__(self, path=TABLE_PATH):
+        self.keys = array(KEY_TYPE)
+        self.values = array('H')
+        self.cache = {}  # State: action values, for states that had to be solved on the spot
+        self.lookups = 0
+        self.searched = 0
+        self.lock = threading.Lock()  # Guards cache and solving, background solves fill the cache in
+        self.solving = set()  # States being solved on a background thread
+        if os.path.exists(path):
+            try:
+                self.load(path)
+            except ValueError as error:
+                print("%s, the hints will be solved as they come up" % error)
+
+    def load(self, path):
+        with open(path, 'rb') as table:
+            data = table.read()
+        magic, version, count, rules = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(path + " is not a version %d solver table" % VERSION)
+        if rules != rules_hash():
+            raise ValueError(path + " was solved for different rules (run python -m lowly_mage.solver)")
+        keys = array(KEY_TYPE)
+        start = HEADER.size
+        end = start + count * keys.itemsize
+        keys.frombytes(data[start:end])
+        self.keys = keys
+        self.values = array('H', data[end:end + count * len(ACTIONS) * 2])
+        if sys.byteorder == 'big':
+            self.keys.byteswap()
+            self.values.byteswap()
+
+    # The stored action values for a state, or None if it isn't in the table
+    def stored(self, state):
+        if not packable(state):
+            return None
+        key = pack_state(state)
+        i = bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            return None
+        stored = self.values[i * len(ACTIONS):(i + 1) * len(ACTIONS)]
+        return tuple(None if value == NOT_AVAILABLE else value / SCALE for value in stored)
+
+    # The best chance of winning from a state in the table, or None
+    def stored_value(self, state):
+        action_values = self.stored(state)
+        if action_values is None:
+            return None
+        return max([value for value in action_values if value is not None] or [0.0])
+
+    # The chance of winning the run after each action in ACTIONS (None where it can't be used)
+    def action_values(self, state):
+        self.lookups += 1
+        action_values = self.stored(state)
+        if action_values is not None:
+            return action_values
+        with self.lock:
+            if state in self.cache:
+                return self.cache[state]
+            self.searched += 1
+        # Solved on the spot, stopping wherever it runs into the table, and everything found on the way is kept
+        solved = solve([state], known=self.stored_value)
+        with self.lock:
+            self.cache.update(solved)
+        return solved[state]
+
+    # Like action_values(), but never waits: a state that has to be solved is handed to a background thread
+    # and this returns None until it's done
+    def action_values_later(self, state):
+        self.lookups += 1
+        action_values = self.stored(state)
+        if action_values is not None:
+            return action_values
+        with self.lock:
+            if state in self.cache:
+                return self.cache[state]
+            if state not in self.solving:
+                self.solving.add(state)
+                self.searched += 1
+                threading.Thread(target=self.solve_in_background, args=(state,), name='solver', daemon=True).start()
+        return None
+
+    def solve_in_background(self, state):
+        solved = solve([state], known=self.stored_value)
+        with self.lock:
+            self.cache.update(solved)
+            self.solving.discard(state)
+
+'''The menu hints. An attack that beats every other attack is "Effective!", one that is clearly worse
+than the best is "Weak...", and a potion is "Recommended!" when drinking it now beats attacking straight
+away. Returns a hint (or "") for every action in ACTIONS, all empty between turns. With wait=False a state
+that isn't in the table is solved in the background, and None means the hints aren't ready yet.'''
+
+WEAK_MARGIN = 0.05  # How much lower the chance of winning has to be for an attack to count as weak
+EPSILON = 0.001  # Differences smaller than this are rounding
+
+def hints(table, player, enemy, enemy_index, wait=True):
+    if enemy.health <= 0 or player.health <= 0 or enemy_index >= ENEMIES_PER_RUN:
+        return ('',) * len(ACTIONS)
+    state = make_state(player, enemy, enemy_index)
+    action_values = table.action_values(state) if wait else table.action_values_later(state)
+    if action_values is None:
+        return None
+    attack_values = [value for value in action_values[:len(ATTACKS)] if value is not None]
+    best_attack = max(attack_values) if attack_values else 0.0
+    result = []
+    for i, value in enumerate(action_values):
+        hint = ''
+        if value is not None:
+            if i < len(ATTACKS):
+                if len(attack_values) > 1 and value > max(other for j, other in enumerate(action_values[:len(ATTACKS)]) if j != i and other is not None) + EPSILON:
+                    hint = " (Effective!)"
+                elif value < best_attack - WEAK_MARGIN:
+                    hint = " (Weak...)"
+            elif value > best_attack + EPSILON:
+                hint = " (Recommended!)"
+        result.append(hint)
+    return tuple(result)
+
+def main():
+    parser = argparse.ArgumentParser(description='Solve the battles and save the table the menu hints use.')
+    parser.add_argument('--output', default=TABLE_PATH)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    solved = solve(start_states(), verbose=True)
+    save(solved, args.output)
+    print("Saved %d states to %s in %.1f s" % (len(solved), args.output, time.perf_counter() - start))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+from collections import OrderedDict
+
+'''Keeps rendered text around so the same string isn't rasterized again every frame. Surfaces are kept
+in least recently used order and the oldest ones are dropped once the cache is full. Lines that change
+often, like "Health: 85/100", are drawn from pieces ("Health: ", "85", "/", "100") so each piece only
+has to be rendered once no matter how the numbers combine.'''
+
+class TextCache:
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0  # Every miss is a font.render() call
+        self.blits = 0
+
+    def render(self, text, color, font):
+        key = (text, tuple(color), font)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = font.render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    # Blits the pieces one after the other starting at pos and returns how wide the whole line was
+    def draw_parts(self, target, parts, pos, color, font):
+        x, y = pos
+        for part in parts:
+            if part:
+                surface = self.render(part, color, font)
+                target.blit(surface, (x, y))
+                self.blits += 1
+                x += surface.get_width()
+        return x - pos[0]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.surfaces),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def report(self):
+        stats = self.stats()
+        print("Text cache: entries=%d, hits=%d, misses=%d, hit_rate=%.3f" % (stats['entries'], stats['hits'], stats['misses'], stats['hit_rate']))
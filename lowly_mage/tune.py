@@ -0,0 +1,157 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import time
+from .logic import default_params, whole
+from .sim import simulate
+
+'''Balance tuning. Tries many parameter sets (see logic.py) against the battle simulator and ranks
+them by how close their win rate comes to a target. Every parameter being tuned gets a range, and either
+every combination on the grid is tried or --random picks that many sets at random from the ranges:
+
+    python -m lowly_mage.tune --target 0.5 --param Goblin.health=30:70:10 --param Fireball.damage=40:60:5
+    python -m lowly_mage.tune --target 0.5 --random 200 --param Dragon.damage=40:90 --param Knight.health=60:120
+
+The sets are spread over a process pool, one worker per core by default, and every set runs the same
+seeded battles so differences come from the numbers and not the dice. Each finished set is appended to the
+checkpoint file straight away, so a sweep that gets stopped picks up where it left off when it's run again
+with the same checkpoint. The ranked results are written to --report as CSV.'''
+
+# Parses 'Goblin.health=30:70:10' (start:stop:step, stop included) or 'Goblin.health=30:70' into (name, values)
+def parse_range(text):
+    name, _, spec = text.partition('=')
+    if name not in default_params():
+        raise argparse.ArgumentTypeError("Unknown parameter " + name)
+    parts = [float(part) for part in spec.split(':')]
+    if len(parts) == 2:
+        return name, (parts[0], parts[1], None)
+    if len(parts) == 3 and parts[2] > 0:
+        return name, (parts[0], parts[1], parts[2])
+    raise argparse.ArgumentTypeError("Expected name=start:stop or name=start:stop:step, got " + text)
+
+def steps(start, stop, step):
+    count = int(round((stop - start) / step))
+    # Rounded so steps like 0.1 don't leave float noise in the parameter sets, whole numbers stay ints
+    return [whole(round(start + i * step, 6)) for i in range(count + 1)]
+
+def grid(ranges):
+    names = sorted(ranges)
+    values = [steps(*ranges[name]) if ranges[name][2] else steps(ranges[name][0], ranges[name][1], 1) for name in names]
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+# The same seed always picks the same sets, which is what lets a random search resume
+def random_sets(ranges, count, seed):
+    rng = random.Random(seed)
+    sets = []
+    for _ in range(count):
+        params = {}
+        for name in sorted(ranges):
+            start, stop, step = ranges[name]
+            if step:
+                params[name] = rng.choice(steps(start, stop, step))
+            else:
+                params[name] = whole(round(rng.uniform(start, stop)))
+        sets.append(params)
+    return sets
+
+def candidate_key(params):
+    return json.dumps(params, sort_keys=True)
+
+# Runs in the workers, only the parameter set goes in and only the summary comes back
+def evaluate(job):
+    params, battles, seed = job
+    start = time.perf_counter()
+    summary = simulate(battles, seed=seed, params=params).summary()
+    return {'params': params, 'summary': summary, 'seconds': time.perf_counter() - start}
+
+def load_checkpoint(path, battles, seed):
+    done = {}
+    if path and os.path.exists(path):
+        with open(path) as checkpoint:
+            for line in checkpoint:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    continue  # A line cut short when the sweep was stopped
+                if result.get('battles') == battles and result.get('seed') == seed:
+                    done[candidate_key(result['params'])] = result
+    return done
+
+def ends_with_newline(path):
+    with open(path, 'rb') as checkpoint:
+        checkpoint.seek(0, os.SEEK_END)
+        if checkpoint.tell() == 0:
+            return True
+        checkpoint.seek(-1, os.SEEK_END)
+        return checkpoint.read(1) == b'\n'
+
+def rank(results, target):
+    for result in results:
+        result['score'] = abs(result['summary']['win_rate'] - target)
+    return sorted(results, key=lambda result: (result['score'], candidate_key(result['params'])))
+
+def write_report(path, ranked, names):
+    columns = ['rank', 'score', 'win_rate', 'turns_mean', 'damage_taken_mean', 'enemies_defeated_mean'] + names
+    with open(path, 'w') as report:
+        report.write(','.join(columns) + '\n')
+        for i, result in enumerate(ranked):
+            summary = result['summary']
+            row = [str(i + 1), '%.5f' % result['score']] + ['%.5f' % summary[column] for column in columns[2:6]]
+            row += [str(result['params'][name]) for name in names]
+            report.write(','.join(row) + '\n')
+
+def main():
+    parser = argparse.ArgumentParser(description='Search for attack, potion and enemy numbers that hit a target win rate.')
+    parser.add_argument('--param', type=parse_range, action='append', required=True, help='name=start:stop[:step], can be repeated')
+    parser.add_argument('--target', type=float, default=0.5, help='win rate to aim for')
+    parser.add_argument('--random', type=int, default=0, help='try this many random sets instead of the whole grid')
+    parser.add_argument('-n', '--battles', type=int, default=100000, help='battles per parameter set')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--checkpoint', default='tune_checkpoint.jsonl')
+    parser.add_argument('--report', default='tune_report.csv')
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    ranges = dict(args.param)
+    candidates = random_sets(ranges, args.random, args.seed) if args.random else grid(ranges)
+    candidates = list({candidate_key(params): params for params in candidates}.values())  # Random picks can repeat
+    done = load_checkpoint(args.checkpoint, args.battles, args.seed)
+    results = [done[candidate_key(params)] for params in candidates if candidate_key(params) in done]
+    todo = [params for params in candidates if candidate_key(params) not in done]
+    print("%d parameter sets, %d already in %s, %d workers" % (len(candidates), len(results), args.checkpoint, args.workers))
+
+    start = time.perf_counter()
+    busy = 0.0
+    if todo:
+        jobs = [(params, args.battles, args.seed) for params in todo]
+        with open(args.checkpoint, 'a') as checkpoint, multiprocessing.Pool(args.workers) as pool:
+            if not ends_with_newline(args.checkpoint):
+                checkpoint.write('\n')  # A sweep stopped halfway through a line left it unfinished
+            # One set per task, so a slow set never holds up a batch of others
+            for i, result in enumerate(pool.imap_unordered(evaluate, jobs, chunksize=1)):
+                result['battles'] = args.battles
+                result['seed'] = args.seed
+                checkpoint.write(json.dumps(result, sort_keys=True) + '\n')
+                checkpoint.flush()
+                results.append(result)
+                busy += result['seconds']
+                print("[%d/%d] win rate %.4f  %s" % (i + 1, len(jobs), result['summary']['win_rate'], candidate_key(result['params'])))
+    elapsed = time.perf_counter() - start
+
+    ranked = rank(results, args.target)
+    write_report(args.report, ranked, sorted(ranges))
+    if todo:
+        print("%d sets in %.1f s (%.1f s of simulation, %.1fx parallel)" % (len(todo), elapsed, busy, busy / elapsed if elapsed else 0.0))
+    print("Best for a %.0f%% win rate (full ranking in %s):" % (args.target * 100, args.report))
+    for i, result in enumerate(ranked[:args.top]):
+        print("%3d. win rate %.4f  %s" % (i + 1, result['summary']['win_rate'], candidate_key(result['params'])))
+
+if __name__ == '__main__':
+    main()